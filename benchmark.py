@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from lab2 import (
+    Client,
+    ClientRepBinary,
+    ClientRepDBAdapter,
+    ClientRepJson,
+    ClientRepSharded,
+    ClientRepSQLite,
+    ClientRepYaml,
+    FilterSortDecorator,
+)
+
+LAST_NAMES = [
+    "Иванов",
+    "Смирнов",
+    "Кузнецов",
+    "Попов",
+    "Васильев",
+    "Петров",
+    "Соколов",
+    "Михайлов",
+    "Новиков",
+    "Фёдоров",
+    "Морозов",
+    "Волков",
+    "Алексеев",
+    "Лебедев",
+    "Семёнов",
+    "Егоров",
+    "Павлов",
+    "Козлов",
+    "Степанов",
+    "Николаев",
+]
+FIRST_NAMES = [
+    "Александр",
+    "Дмитрий",
+    "Максим",
+    "Сергей",
+    "Андрей",
+    "Алексей",
+    "Артём",
+    "Илья",
+    "Кирилл",
+    "Михаил",
+    "Анна",
+    "Мария",
+    "Елена",
+    "Ольга",
+    "Наталья",
+    "Юлия",
+    "Дарья",
+    "Алёна",
+    "Ирина",
+    "Татьяна",
+]
+PATRONYMICS = [
+    "Александрович",
+    "Дмитриевич",
+    "Сергеевич",
+    "Андреевич",
+    "Иванович",
+    "Петрович",
+    "Николаевна",
+    "Сергеевна",
+    "Ивановна",
+    "Андреевна",
+    None,
+]
+CITIES = [
+    "Москва",
+    "Санкт-Петербург",
+    "Краснодар",
+    "Ставрополь",
+    "Пятигорск",
+    "Казань",
+    "Тверь",
+    "Новосибирск",
+]
+STREETS = ["Садовая", "Ленина", "Мира", "Гагарина", "Пушкина", "Советская"]
+
+BACKENDS = ("json", "yaml", "decorator", "sqlite", "binary", "sharded", "postgres")
+DEFAULT_BACKENDS = ("json", "yaml", "decorator", "sqlite", "binary", "sharded")
+
+
+def generate_clients(size, seed=42):
+    rng = random.Random(seed)
+    clients = []
+    for client_id in range(1, size + 1):
+        city = rng.choice(CITIES)
+        clients.append(
+            Client.from_trusted_row(
+                client_id,
+                rng.choice(LAST_NAMES),
+                rng.choice(FIRST_NAMES),
+                rng.choice(PATRONYMICS),
+                f"г.{city}, ул. {rng.choice(STREETS)} {rng.randint(1, 200)}",
+                "+7" + "".join(rng.choice("0123456789") for _ in range(10)),
+            )
+        )
+    return clients
+
+
+def create_repo(backend, workdir, clients):
+    if backend == "json":
+        repo = ClientRepJson(os.path.join(workdir, "clients.json"))
+    elif backend == "yaml":
+        repo = ClientRepYaml(os.path.join(workdir, "clients.yaml"))
+    elif backend == "decorator":
+        repo = FilterSortDecorator(
+            ClientRepJson(os.path.join(workdir, "decorated.json")),
+            filter_func=lambda client: client.address.startswith("г.Москва"),
+            sort_key="last_name",
+        )
+    elif backend == "sqlite":
+        repo = ClientRepSQLite(os.path.join(workdir, "clients.db"))
+    elif backend == "binary":
+        repo = ClientRepBinary(os.path.join(workdir, "clients.bin"))
+    elif backend == "sharded":
+        repo = ClientRepSharded(os.path.join(workdir, "sharded.json"))
+    elif backend == "postgres":
+        repo = ClientRepDBAdapter(trusted=True)
+        outcomes = repo.add_clients_bulk(
+            [
+                {
+                    "last_name": client.last_name,
+                    "first_name": client.first_name,
+                    "otch": client.otch,
+                    "address": client.address,
+                    "phone": client.phone,
+                }
+                for client in clients
+            ],
+            use_copy=True,
+        )
+        repo.benchmark_ids = [outcome.client_id for outcome in outcomes]
+        return repo
+    else:
+        raise ValueError(f"Неизвестный бэкенд: {backend}")
+    if not repo.write_all(clients):
+        raise RuntimeError(f"Не удалось записать данные для {backend}")
+    return repo
+
+
+def cleanup_repo(backend, repo):
+    if backend == "postgres":
+        added = getattr(repo, "benchmark_added", [])
+        repo.delete_clients_bulk(repo.benchmark_ids + added)
+    close = getattr(repo, "close", None)
+    if close is not None:
+        close()
+
+
+def build_operations(repo, size, page_size):
+    ids = getattr(repo, "benchmark_ids", None) or list(range(1, size + 1))
+    rng = random.Random(7)
+    deep_page = max(size // page_size, 1)
+    added = []
+    repo.benchmark_added = added
+
+    def add_client():
+        client = repo.add_client("Тестов", "Тест", "+70000000000", "г.Москва")
+        if client is not None:
+            added.append(client.client_id)
+
+    def update_client():
+        repo.update_client(added[-1] if added else ids[0], otch="Тестович")
+
+    def delete_client():
+        if not added:
+            add_client()
+        if added:
+            repo.delete_client(added.pop())
+
+    def read_all_cold():
+        for name in ("invalidate_view", "invalidate_cache"):
+            invalidate = getattr(repo, name, None)
+            if invalidate is not None:
+                invalidate()
+        repo.read_all()
+
+    return [
+        ("read_all_cold", read_all_cold),
+        ("read_all", repo.read_all),
+        ("get_by_id", lambda: repo.get_by_id(rng.choice(ids))),
+        ("get_k_n_short_list_first", lambda: repo.get_k_n_short_list(page_size, 1)),
+        (
+            "get_k_n_short_list_deep",
+            lambda: repo.get_k_n_short_list(page_size, deep_page),
+        ),
+        ("get_count", repo.get_count),
+        ("add_client", add_client),
+        ("update_client", update_client),
+        ("delete_client", delete_client),
+    ]
+
+
+def measure(operation, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_bytes": peak,
+    }
+
+
+def run(backends, sizes, repeat, page_size, seed):
+    results = {}
+    for size in sizes:
+        clients = generate_clients(size, seed)
+        for backend in backends:
+            workdir = tempfile.mkdtemp(prefix="clients_bench_")
+            try:
+                try:
+                    repo = create_repo(backend, workdir, clients)
+                except Exception as e:
+                    print(f"{backend:<10} {size:>9}  пропущен: {e}")
+                    continue
+                try:
+                    for name, operation in build_operations(repo, size, page_size):
+                        key = f"{backend}/{size}/{name}"
+                        results[key] = measure(operation, repeat)
+                        print(
+                            f"{backend:<10} {size:>9}  {name:<26} "
+                            f"{results[key]['median_s'] * 1000:>10.3f} мс "
+                            f"{results[key]['peak_bytes'] / 1024:>10.1f} КиБ"
+                        )
+                finally:
+                    cleanup_repo(backend, repo)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)["results"]
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None or previous["median_s"] == 0:
+            continue
+        ratio = current["median_s"] / previous["median_s"]
+        if ratio > threshold:
+            regressions.append((key, ratio))
+    for key, ratio in regressions:
+        print(f"РЕГРЕССИЯ {key}: в {ratio:.2f} раза медленнее базовой линии")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк репозиториев клиентов")
+    parser.add_argument(
+        "--backends", nargs="+", choices=BACKENDS, default=list(DEFAULT_BACKENDS)
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    results = run(args.backends, args.sizes, args.repeat, args.page_size, args.seed)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "page_size": args.page_size,
+                "results": results,
+            },
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
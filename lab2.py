@@ -1,12 +1,49 @@
+import asyncio
+import base64
+import bisect
+import functools
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import logging
+import mmap
+import os
+import threading
+import time
+import uuid
 import yaml
 import re
+import sqlite3
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from typing import Any, Callable, List, Optional, Union
 
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 
 class ShortClient:
+    __slots__ = ("__client_id", "__last_name", "__first_name", "__phone")
+
+    NAME_PATTERN = re.compile(r"^[А-Яа-яЁё\s]+$")
+    PHONE_PATTERN = re.compile(r"^\+\d{11}$")
+
     def __init__(self, client_id=None, last_name=None, first_name=None, phone=None):
         self.__client_id = client_id
         self.__last_name = last_name
@@ -31,15 +68,19 @@ class ShortClient:
 
     @staticmethod
     def is_valid_id(client_id):
-        return client_id is not None and client_id > 0
+        return isinstance(client_id, int) and client_id > 0
 
     @staticmethod
     def is_valid_name(name):
-        return name is not None and re.match(r"^[А-Яа-яЁё\s]+$", name) is not None
+        return (
+            isinstance(name, str) and ShortClient.NAME_PATTERN.match(name) is not None
+        )
 
     @staticmethod
     def is_valid_phone(phone):
-        return phone is not None and re.match(r"^\+\d{11}$", phone) is not None
+        return isinstance(phone, str) and (
+            ShortClient.PHONE_PATTERN.match(phone) is not None
+        )
 
     def set_client_id(self, client_id):
         if not ShortClient.is_valid_id(client_id):
@@ -68,6 +109,10 @@ class ShortClient:
 
 
 class Client(ShortClient):
+    __slots__ = ("__otch", "__address")
+
+    FIELDS = ("client_id", "last_name", "first_name", "otch", "address", "phone")
+
     def __init__(self, *args, **kwargs):
         data = kwargs.pop("data", None)
 
@@ -131,7 +176,7 @@ class Client(ShortClient):
 
     def set_otch(self, otch):
         if otch and otch.strip() != "":
-            if not re.match(r"^[А-Яа-яЁё\s]+$", otch):
+            if not ShortClient.NAME_PATTERN.match(otch):
                 raise ValueError("Отчество должно содержать только буквы")
         self.__otch = otch
 
@@ -140,6 +185,54 @@ class Client(ShortClient):
             raise ValueError("Адрес не должен быть пустым")
         self.__address = address
 
+    @classmethod
+    def from_trusted_row(
+        cls, client_id, last_name, first_name, otch=None, address=None, phone=None
+    ):
+        client = cls.__new__(cls)
+        ShortClient.__init__(client, client_id, last_name, first_name, phone)
+        client.__otch = otch
+        client.__address = address
+        return client
+
+    @classmethod
+    def validate_fields(cls, data, fields=FIELDS, partial=False):
+        scratch = cls()
+        setters = {
+            "client_id": scratch.set_client_id,
+            "last_name": scratch.set_last_name,
+            "first_name": scratch.set_first_name,
+            "otch": scratch.set_otch,
+            "address": scratch.set_address,
+            "phone": scratch.set_phone,
+        }
+        errors = []
+        for field in fields:
+            value = data.get(field)
+            if partial and value is None:
+                continue
+            try:
+                setters[field](value)
+            except ValueError as e:
+                errors.append(f"{field}: {e}")
+            except AttributeError:
+                errors.append(f"{field}: некорректное значение {value!r}")
+        return errors
+
+    @classmethod
+    def validate_batch(cls, rows):
+        clients = []
+        errors = []
+        for position, row in enumerate(rows):
+            row_errors = cls.validate_fields(row)
+            if row_errors:
+                errors.append((position, row_errors))
+                continue
+            clients.append(
+                cls.from_trusted_row(*[row.get(field) for field in cls.FIELDS])
+            )
+        return clients, errors
+
     def from_str(self, data):
         data = data.strip()
         if data.startswith("{"):
@@ -151,13 +244,17 @@ class Client(ShortClient):
             self.set_address(data_dict.get("address"))
             self.set_phone(data_dict.get("phone"))
         else:
-            parts = data.split(",")
-            self.set_client_id(int(parts[0]))
+            parts = data.split(",", 4)
+            if len(parts) < 5 or "," not in parts[4]:
+                raise ValueError("Недостаточно полей в строке")
+            address, phone = parts[4].rsplit(",", 1)
+            client_id = parts[0].strip()
+            self.set_client_id(int(client_id) if client_id.isdigit() else client_id)
             self.set_last_name(parts[1])
             self.set_first_name(parts[2])
-            self.set_otch(parts[3])
-            self.set_address(parts[4])
-            self.set_phone(parts[5])
+            self.set_otch(parts[3] or None)
+            self.set_address(address)
+            self.set_phone(phone)
 
     def short(self):
         return ShortClient(
@@ -167,6 +264,16 @@ class Client(ShortClient):
             phone=self.phone,
         )
 
+    def to_dict(self):
+        return {
+            "client_id": self.client_id,
+            "last_name": self.last_name,
+            "first_name": self.first_name,
+            "otch": self.otch,
+            "address": self.address,
+            "phone": self.phone,
+        }
+
     def get_long_info(self):
         otch_info = f", Отчество: {self.otch}" if self.otch else ""
         return (
@@ -188,9 +295,349 @@ class Client(ShortClient):
         )
 
 
+class ClientFilter:
+    SQL_OPERATORS = {"=": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+    OPERATORS = tuple(SQL_OPERATORS) + ("prefix", "in")
+
+    def __init__(self, field, op, value):
+        if field not in Client.FIELDS:
+            raise ValueError(f"Неизвестное поле клиента: {field}")
+        if op not in self.OPERATORS:
+            raise ValueError(f"Неизвестная операция фильтра: {op}")
+        if op == "in":
+            value = tuple(value)
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def matches(self, client):
+        return self.matches_value(getattr(client, self.field))
+
+    def matches_value(self, actual):
+        if actual is None:
+            return False
+        if self.op == "prefix":
+            return isinstance(actual, str) and actual.startswith(self.value)
+        if self.op == "in":
+            return actual in self.value
+        if self.op == "=":
+            return actual == self.value
+        if self.op == "!=":
+            return actual != self.value
+        if self.op == "<":
+            return actual < self.value
+        if self.op == "<=":
+            return actual <= self.value
+        if self.op == ">":
+            return actual > self.value
+        return actual >= self.value
+
+    def to_sql(self, dialect="postgresql"):
+        if dialect == "sqlite":
+            return self._to_sqlite()
+        if self.op == "prefix":
+            escaped = (
+                self.value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            return f"{self.field} LIKE %s", [escaped + "%"]
+        if self.op == "in":
+            return f"{self.field} = ANY(%s)", [list(self.value)]
+        return f"{self.field} {self.SQL_OPERATORS[self.op]} %s", [self.value]
+
+    def _to_sqlite(self):
+        if self.op == "prefix":
+            return f"substr({self.field}, 1, ?) = ?", [len(self.value), self.value]
+        if self.op == "in":
+            if not self.value:
+                return "0", []
+            placeholders = ", ".join(["?"] * len(self.value))
+            return f"{self.field} IN ({placeholders})", list(self.value)
+        return f"{self.field} {self.SQL_OPERATORS[self.op]} ?", [self.value]
+
+
+class ClientQuery:
+    def __init__(self, filters=(), order_by=()):
+        self.filters = [
+            item if isinstance(item, ClientFilter) else ClientFilter(*item)
+            for item in filters
+        ]
+        self.order_by = []
+        for item in order_by:
+            field = item.lstrip("-")
+            if field not in Client.FIELDS:
+                raise ValueError(f"Неизвестное поле клиента: {field}")
+            self.order_by.append((field, item.startswith("-")))
+
+    def matches(self, client):
+        return all(item.matches(client) for item in self.filters)
+
+    def sort(self, clients):
+        for field, descending in reversed(self.order_by):
+            clients.sort(
+                key=lambda client: (
+                    getattr(client, field) is None,
+                    getattr(client, field),
+                ),
+                reverse=descending,
+            )
+        return clients
+
+    def apply(self, clients):
+        return self.sort([client for client in clients if self.matches(client)])
+
+    def where_sql(self, dialect="postgresql"):
+        if not self.filters:
+            return "", []
+        parts = []
+        params = []
+        for item in self.filters:
+            sql, item_params = item.to_sql(dialect)
+            parts.append(sql)
+            params.extend(item_params)
+        return " WHERE " + " AND ".join(parts), params
+
+    def order_sql(self, dialect="postgresql"):
+        parts = []
+        for field, descending in self.order_by:
+            if dialect == "sqlite":
+                null_order = " DESC" if descending else ""
+                parts.append(f"{field} IS NULL{null_order}")
+            parts.append(f"{field} DESC" if descending else field)
+        if "client_id" not in [field for field, _ in self.order_by]:
+            parts.append("client_id")
+        return " ORDER BY " + ", ".join(parts)
+
+
+class ClientTable:
+    def __init__(self):
+        self.client_ids = array("q")
+        self.last_names = []
+        self.first_names = []
+        self.otchs = []
+        self.address_ids = array("l")
+        self.phones = []
+        self._address_pool = []
+        self._address_index = {}
+
+    @classmethod
+    def from_clients(cls, clients):
+        table = cls()
+        for client in clients:
+            table.append(
+                client.client_id,
+                client.last_name,
+                client.first_name,
+                client.otch,
+                client.address,
+                client.phone,
+            )
+        return table
+
+    @staticmethod
+    def _intern(value):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def _address_id(self, address):
+        address_id = self._address_index.get(address)
+        if address_id is None:
+            address_id = len(self._address_pool)
+            self._address_pool.append(self._intern(address))
+            self._address_index[address] = address_id
+        return address_id
+
+    def append(self, client_id, last_name, first_name, otch, address, phone):
+        self.client_ids.append(client_id)
+        self.last_names.append(self._intern(last_name))
+        self.first_names.append(self._intern(first_name))
+        self.otchs.append(self._intern(otch))
+        self.address_ids.append(self._address_id(address))
+        self.phones.append(phone)
+
+    def __len__(self):
+        return len(self.client_ids)
+
+    def column(self, field):
+        if field == "client_id":
+            return self.client_ids
+        if field == "last_name":
+            return self.last_names
+        if field == "first_name":
+            return self.first_names
+        if field == "otch":
+            return self.otchs
+        if field == "address":
+            pool = self._address_pool
+            return [pool[address_id] for address_id in self.address_ids]
+        if field == "phone":
+            return self.phones
+        raise ValueError(f"Неизвестное поле клиента: {field}")
+
+    def value(self, index, field):
+        if field == "address":
+            return self._address_pool[self.address_ids[index]]
+        return self.column(field)[index]
+
+    def row(self, index):
+        return (
+            self.client_ids[index],
+            self.last_names[index],
+            self.first_names[index],
+            self.otchs[index],
+            self._address_pool[self.address_ids[index]],
+            self.phones[index],
+        )
+
+    def client(self, index):
+        client_id, last_name, first_name, otch, address, phone = self.row(index)
+        return Client(
+            client_id=client_id,
+            last_name=last_name,
+            first_name=first_name,
+            otch=otch,
+            address=address,
+            phone=phone,
+        )
+
+    def short(self, index):
+        return ShortClient(
+            client_id=self.client_ids[index],
+            last_name=self.last_names[index],
+            first_name=self.first_names[index],
+            phone=self.phones[index],
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(len(self))[index])
+        return self.client(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.client(index)
+
+    def take(self, indices):
+        table = ClientTable()
+        for index in indices:
+            table.append(*self.row(index))
+        return table
+
+    def filter_indices(self, spec, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        selected = list(indices)
+        for item in spec.filters:
+            if item.field == "address":
+                pool_matches = [
+                    item.matches_value(address) for address in self._address_pool
+                ]
+                address_ids = self.address_ids
+                selected = [i for i in selected if pool_matches[address_ids[i]]]
+            else:
+                column = self.column(item.field)
+                selected = [i for i in selected if item.matches_value(column[i])]
+        return selected
+
+    def sort_indices(self, order_by, indices=None):
+        indices = list(range(len(self)) if indices is None else indices)
+        for field, descending in reversed(order_by):
+            column = self.column(field)
+            indices.sort(
+                key=lambda i: (column[i] is None, column[i]), reverse=descending
+            )
+        return indices
+
+    def query_indices(self, spec):
+        return self.sort_indices(spec.order_by, self.filter_indices(spec))
+
+    def query(self, spec):
+        return self.take(self.query_indices(spec))
+
+    def get_k_n_short_list(self, k, n, indices=None):
+        start_index = max((n - 1) * k, 0)
+        if indices is None:
+            indices = range(len(self))
+        return [self.short(i) for i in indices[start_index : start_index + k]]
+
+
 class ClientRep:
-    def __init__(self, filename):
+    PREFIX_FIELDS = ("last_name", "first_name")
+    native_queries = False
+    generates_ids = False
+
+    def __init__(self, filename, indexed_fields=("phone", "last_name")):
         self.filename = filename
+        self.indexed_fields = tuple(indexed_fields)
+        self._shared_index = self._empty_index()
+        self._batch_state = threading.local()
+
+    @staticmethod
+    def _empty_index():
+        return {"primary": None, "secondary": {}, "prefix": None, "version": None}
+
+    def _index_state(self):
+        index = getattr(self._batch_state, "index", None)
+        return self._shared_index if index is None else index
+
+    @property
+    def _primary_index(self):
+        return self._index_state()["primary"]
+
+    @_primary_index.setter
+    def _primary_index(self, value):
+        self._index_state()["primary"] = value
+
+    @property
+    def _secondary_indexes(self):
+        return self._index_state()["secondary"]
+
+    @_secondary_indexes.setter
+    def _secondary_indexes(self, value):
+        self._index_state()["secondary"] = value
+
+    @property
+    def _prefix_entries(self):
+        return self._index_state()["prefix"]
+
+    @_prefix_entries.setter
+    def _prefix_entries(self, value):
+        self._index_state()["prefix"] = value
+
+    @property
+    def _index_version(self):
+        return self._index_state()["version"]
+
+    @_index_version.setter
+    def _index_version(self, value):
+        self._index_state()["version"] = value
+
+    @property
+    def _batch(self):
+        return getattr(self._batch_state, "clients", None)
+
+    @_batch.setter
+    def _batch(self, clients):
+        self._batch_state.clients = clients
+
+    @property
+    def _batch_dirty(self):
+        return getattr(self._batch_state, "dirty", False)
+
+    @_batch_dirty.setter
+    def _batch_dirty(self, value):
+        self._batch_state.dirty = value
+
+    def _begin_batch_index(self):
+        self._batch_state.index = self._empty_index()
+
+    def _end_batch_index(self, committed):
+        index, self._batch_state.index = self._batch_state.index, None
+        if not committed:
+            return
+        if index["version"] is None:
+            self._index_version = None
+            return
+        self._shared_index = index
+        self._index_version = self._data_version()
 
     def read_all(self):
         raise NotImplementedError
@@ -198,13 +645,166 @@ class ClientRep:
     def write_all(self, clients):
         raise NotImplementedError
 
-    def get_by_id(self, client_id):
-        clients = self.read_all()
-        for client in clients:
-            if client.client_id == client_id:
-                return client
+    def _data_version(self):
         return None
 
+    def io_counters(self):
+        return {"bytes_read": 0, "bytes_written": 0, "round_trips": 0}
+
+    def _indexes_current(self):
+        return (
+            self._primary_index is not None
+            and self._index_version is not None
+            and self._index_version == self._data_version()
+        )
+
+    def _build_indexes(self):
+        version = self._data_version()
+        clients = self._working_set()
+        primary = {}
+        secondary = {field: {} for field in self.indexed_fields}
+        for client in clients:
+            self._index_add(client, primary, secondary)
+        prefix = None
+        if self._prefix_entries is not None:
+            prefix = self._build_prefix_entries(primary.values())
+        self._primary_index = primary
+        self._secondary_indexes = secondary
+        self._prefix_entries = prefix
+        self._index_version = version
+
+    def _ensure_indexes(self):
+        if not self._indexes_current():
+            self._build_indexes()
+
+    def _index_add(self, client, primary=None, secondary=None):
+        primary = self._primary_index if primary is None else primary
+        secondary = self._secondary_indexes if secondary is None else secondary
+        primary[client.client_id] = client
+        for field, index in secondary.items():
+            index.setdefault(getattr(client, field), {})[client.client_id] = client
+
+    def _index_remove(self, client):
+        self._primary_index.pop(client.client_id, None)
+        for field, index in self._secondary_indexes.items():
+            value = getattr(client, field)
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(client.client_id, None)
+                if not bucket:
+                    del index[value]
+
+    def _index_apply(self, was_current, old_client=None, new_client=None):
+        if not was_current:
+            return
+        if old_client is not None:
+            self._index_remove(old_client)
+            self._prefix_remove(old_client)
+        if new_client is not None:
+            self._index_add(new_client)
+            self._prefix_add(new_client)
+        self._index_version = self._data_version()
+
+    @staticmethod
+    def _prefix_key(value):
+        return str(value).lower().replace("ё", "е")
+
+    def _prefix_items(self, client):
+        for field in self.PREFIX_FIELDS:
+            value = getattr(client, field)
+            if value:
+                yield self._prefix_key(value), client.client_id
+
+    def _build_prefix_entries(self, clients):
+        return sorted(item for client in clients for item in self._prefix_items(client))
+
+    def _prefix_add(self, client):
+        if self._prefix_entries is None:
+            return
+        for item in self._prefix_items(client):
+            bisect.insort(self._prefix_entries, item)
+
+    def _prefix_remove(self, client):
+        entries = self._prefix_entries
+        if entries is None:
+            return
+        for item in self._prefix_items(client):
+            position = bisect.bisect_left(entries, item)
+            if position < len(entries) and entries[position] == item:
+                del entries[position]
+
+    def _iter_prefix(self, prefix):
+        self._ensure_indexes()
+        if self._prefix_entries is None:
+            self._prefix_entries = self._build_prefix_entries(
+                self._primary_index.values()
+            )
+        entries = self._prefix_entries
+        primary = self._primary_index
+        key = self._prefix_key(prefix)
+        seen = set()
+        for position in range(bisect.bisect_left(entries, (key,)), len(entries)):
+            name, client_id = entries[position]
+            if not name.startswith(key):
+                break
+            if client_id not in seen:
+                seen.add(client_id)
+                yield primary[client_id]
+
+    def search_prefix(self, prefix, limit=20):
+        return list(itertools.islice(self._iter_prefix(prefix), limit))
+
+    def get_by_id(self, client_id):
+        self._ensure_indexes()
+        return self._primary_index.get(client_id)
+
+    def find_by_field(self, field, value):
+        if field not in self.indexed_fields:
+            return [
+                client for client in self.read_all() if getattr(client, field) == value
+            ]
+        self._ensure_indexes()
+        return list(self._secondary_indexes[field].get(value, {}).values())
+
+    def find_by_phone(self, phone):
+        return self.find_by_field("phone", phone)
+
+    def find_by_last_name(self, last_name):
+        return self.find_by_field("last_name", last_name)
+
+    def _query_candidates(self, spec):
+        for item in spec.filters:
+            if item.op != "=":
+                continue
+            if item.field == "client_id":
+                client = self.get_by_id(item.value)
+                return [client] if client is not None else []
+            if item.field in self.indexed_fields:
+                return self.find_by_field(item.field, item.value)
+        return self.read_all()
+
+    def iter_all(self):
+        return iter(self.read_all())
+
+    def read_table(self):
+        return ClientTable.from_clients(self.iter_all())
+
+    def iter_query(self, spec):
+        if spec.order_by:
+            return iter(self.query(spec))
+        return (client for client in self.iter_all() if spec.matches(client))
+
+    def query(self, spec):
+        return spec.apply(self._query_candidates(spec))
+
+    def query_count(self, spec):
+        return sum(1 for client in self._query_candidates(spec) if spec.matches(client))
+
+    def query_page(self, spec, k, n):
+        start_index = max((n - 1) * k, 0)
+        clients = self.query(spec)
+        return [client.short() for client in clients[start_index : start_index + k]]
+
     def sort_by_field(self, field="last_name", reverse=False):
         clients = self.read_all()
         clients.sort(key=lambda client: getattr(client, field) or "", reverse=reverse)
@@ -221,26 +821,38 @@ class ClientRep:
                 result.append(short_client)
         return result
 
-    def add_client(self, last_name, first_name, phone, address, otch=None):
-        clients = self.read_all()
+    def _allocate_id(self, clients, count=1):
         new_id = 0
         for client in clients:
             if client.client_id > new_id:
                 new_id = client.client_id
-        new_id += 1
-        try:
-            new_client = Client(
-                client_id=new_id,
-                last_name=last_name,
-                first_name=first_name,
-                phone=phone,
-                address=address,
-                otch=otch,
-            )
-            clients.append(new_client)
-            return new_client if self.write_all(clients) else None
-        except ValueError:
+        return new_id + 1
+
+    def _assign_ids(self, existing, clients):
+        first_id = self._allocate_id(existing, len(clients))
+        for offset, client in enumerate(clients):
+            client.set_client_id(first_id + offset)
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "otch": otch,
+            "address": address,
+            "phone": phone,
+        }
+        if Client.validate_fields(data, Client.FIELDS[1:]):
+            return None
+        clients = self._working_set()
+        indexed = self._indexes_current()
+        new_client = Client.from_trusted_row(
+            self._allocate_id(clients), last_name, first_name, otch, address, phone
+        )
+        clients.append(new_client)
+        if not self._persist_put(clients, new_client):
             return None
+        self._index_apply(indexed, new_client=new_client)
+        return new_client
 
     def update_client(
         self,
@@ -251,7 +863,10 @@ class ClientRep:
         address=None,
         otch=None,
     ):
-        clients = self.read_all()
+        clients = self._working_set()
+        indexed = self._indexes_current()
+        if indexed and client_id not in self._primary_index:
+            return None
         for i, client in enumerate(clients):
             if client.client_id == client_id:
                 new_last_name = last_name if last_name is not None else client.last_name
@@ -270,11 +885,17 @@ class ClientRep:
                     otch=new_otch,
                 )
                 clients[i] = updated_client
-                return updated_client if self.write_all(clients) else None
+                if not self._persist_put(clients, updated_client):
+                    return None
+                self._index_apply(indexed, client, updated_client)
+                return updated_client
         return None
 
     def delete_client(self, client_id: int):
-        clients = self.read_all()
+        clients = self._working_set()
+        indexed = self._indexes_current()
+        if indexed and client_id not in self._primary_index:
+            return False
         index_to_delete = None
         for i, c in enumerate(clients):
             if c.client_id == client_id:
@@ -282,211 +903,220 @@ class ClientRep:
                 break
         if index_to_delete is None:
             return False
-        clients.pop(index_to_delete)
+        deleted_client = clients.pop(index_to_delete)
+        if not self._persist_delete(clients, client_id):
+            return False
+        self._index_apply(indexed, old_client=deleted_client)
+        return True
+
+    def _working_set(self):
+        if self._batch is not None:
+            return self._batch
+        return self.read_all()
+
+    @contextmanager
+    def batch(self):
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = self.read_all()
+        self._batch_dirty = False
+        self._begin_batch_index()
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            self._end_batch_index(False)
+            raise
+        clients, self._batch = self._batch, None
+        if not self._batch_dirty:
+            self._end_batch_index(False)
+            return
+        if not self.write_all(clients):
+            self._end_batch_index(False)
+            self._index_version = None
+            raise RuntimeError("Не удалось сохранить изменения пакета")
+        self._end_batch_index(True)
+
+    def append_clients(self, clients, assign_ids=False):
+        if self._batch is None:
+            existing = self.read_all()
+            if assign_ids:
+                self._assign_ids(existing, clients)
+            existing.extend(clients)
+            return self.write_all(existing)
+        if assign_ids:
+            self._assign_ids(self._batch, clients)
+        indexed = self._indexes_current()
+        for client in clients:
+            self._batch.append(client)
+            self._index_apply(indexed, new_client=client)
+        self._batch_dirty = True
+        return True
+
+    def _persist_put(self, clients, client):
+        if self._batch is not None:
+            self._batch_dirty = True
+            return True
+        return self.write_all(clients)
+
+    def _persist_delete(self, clients, client_id):
+        if self._batch is not None:
+            self._batch_dirty = True
+            return True
         return self.write_all(clients)
 
     def get_count(self):
         return len(self.read_all())
 
 
-class ClientRepJson(ClientRep):
-    def read_all(self):
-        try:
-            with open(self.filename, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                clients = []
-                for item in data:
-                    client = Client(
-                        client_id=item.get("client_id"),
-                        last_name=item.get("last_name"),
-                        first_name=item.get("first_name"),
-                        otch=item.get("otch"),
-                        address=item.get("address"),
-                        phone=item.get("phone"),
-                    )
-                    clients.append(client)
-                return clients
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def write_all(self, clients):
-        try:
-            data = []
-            for client in clients:
-                client_data = {
-                    "client_id": client.client_id,
-                    "last_name": client.last_name,
-                    "first_name": client.first_name,
-                    "otch": client.otch,
-                    "address": client.address,
-                    "phone": client.phone,
-                }
-                data.append(client_data)
-            with open(self.filename, "w", encoding="utf-8") as file:
-                json.dump(data, file, ensure_ascii=False, indent=2)
-            return True
-        except Exception:
-            return False
-
-
-class ClientRepYaml(ClientRep):
-    def read_all(self):
-        try:
-            with open(self.filename, "r", encoding="utf-8") as file:
-                data = yaml.safe_load(file)
-                if data is None:
-                    return []
-                clients = []
-                for item in data:
-                    client = Client(
-                        client_id=item.get("client_id"),
-                        last_name=item.get("last_name"),
-                        first_name=item.get("first_name"),
-                        otch=item.get("otch"),
-                        address=item.get("address"),
-                        phone=item.get("phone"),
-                    )
-                    clients.append(client)
-                return clients
-        except FileNotFoundError:
-            return []
+def _lock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
 
-    def write_all(self, clients):
-        try:
-            data = []
-            for client in clients:
-                client_data = {
-                    "client_id": client.client_id,
-                    "last_name": client.last_name,
-                    "first_name": client.first_name,
-                    "otch": client.otch,
-                    "address": client.address,
-                    "phone": client.phone,
-                }
-                data.append(client_data)
-            with open(self.filename, "w", encoding="utf-8") as file:
-                yaml.dump(data, file, allow_unicode=True, default_flow_style=False)
-            return True
-        except Exception:
-            return False
 
+def _unlock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
 
-class DatabaseSingleton:
-    _instance = None
 
-    def __new__(
-        cls,
-        host="localhost",
-        user="postgres",
-        password="123",
-        database="clients_database",
-        port="5432",
+class ClientRepFile(ClientRep):
+    def __init__(
+        self,
+        filename,
+        use_cache=True,
+        journal=False,
+        compact_threshold=64 * 1024,
+        background_compaction=True,
+        indexed_fields=("phone", "last_name"),
+        trusted=False,
     ):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize(host, user, password, database, port)
-        return cls._instance
+        super().__init__(filename, indexed_fields)
+        self.use_cache = use_cache
+        self.trusted = trusted
+        self.journal = journal
+        self.journal_path = f"{filename}.journal"
+        self.lock_path = f"{filename}.lock"
+        self._lock_handle = None
+        self.compact_threshold = compact_threshold
+        self.background_compaction = background_compaction
+        self._cache = None
+        self._cache_stamp = None
+        self._journal_lock = threading.RLock()
+        self._compaction_thread = None
+        self.bytes_read = 0
+        self.bytes_written = 0
 
-    def _initialize(self, host, user, password, database, port):
-        self.connection = psycopg2.connect(
-            host=host, user=user, password=password, database=database, port=port
+    @staticmethod
+    def _stat_stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _file_stamp(self):
+        stamp = self._stat_stamp(self.filename)
+        if self.journal:
+            return stamp, self._stat_stamp(self.journal_path)
+        return stamp
+
+    def _client_from_item(self, item):
+        if self.trusted:
+            return Client.from_trusted_row(
+                item.get("client_id"),
+                item.get("last_name"),
+                item.get("first_name"),
+                item.get("otch"),
+                item.get("address"),
+                item.get("phone"),
+            )
+        return Client(
+            client_id=item.get("client_id"),
+            last_name=item.get("last_name"),
+            first_name=item.get("first_name"),
+            otch=item.get("otch"),
+            address=item.get("address"),
+            phone=item.get("phone"),
         )
 
-    def execute_query(self, query, params=None, fetch=False):
-        cursor = self.connection.cursor()
-        cursor.execute(query, params or ())
-        result = cursor.fetchall() if fetch else cursor.rowcount
-        self.connection.commit()
-        cursor.close()
-        return result
-
-    def close(self):
-        if self.connection:
-            self.connection.close()
-            self._instance = None
-
-
-class DatabaseDelegate:
-    def __init__(self, db_connector):
-        self.db = db_connector
-
-    def find_by_id(self, table, id_value):
-        sql = f"SELECT * FROM {table} WHERE client_id = %s"
-        return self.db.execute_query(sql, [id_value], fetch=True)
-
-    def get_all_paginated(self, table, limit, offset):
-        sql = f"SELECT * FROM {table} ORDER BY client_id LIMIT %s OFFSET %s"
-        return self.db.execute_query(sql, [limit, offset], fetch=True)
-
-    def insert(self, table, data):
-        columns = ", ".join(data.keys())
-        values_placeholder = ", ".join(["%s"] * len(data))
-        sql = f"INSERT INTO {table} ({columns}) VALUES ({values_placeholder})"
-        return self.db.execute_query(sql, list(data.values()))
-
-    def update(self, table, updates, id_value):
-        set_expr = ", ".join([f"{key} = %s" for key in updates.keys()])
-        sql = f"UPDATE {table} SET {set_expr} WHERE client_id = %s"
-        params = list(updates.values()) + [id_value]
-        return self.db.execute_query(sql, params)
-
-    def delete(self, table, id_value):
-        sql = f"DELETE FROM {table} WHERE client_id = %s"
-        return self.db.execute_query(sql, [id_value])
+    def _data_version(self):
+        return self._file_stamp()
 
-    def count(self, table):
-        sql = f"SELECT COUNT(*) FROM {table}"
-        result = self.db.execute_query(sql, fetch=True)
-        return result[0][0] if result else 0
+    def _cache_is_fresh(self):
+        return (
+            self.use_cache
+            and self._cache is not None
+            and self._file_stamp() == self._cache_stamp
+        )
 
+    def _read_clients(self):
+        raise NotImplementedError
 
-class ClientRepDB:
-    def __init__(self):
-        self.db = DatabaseSingleton()
-        self.delegate = DatabaseDelegate(self.db)
+    def _write_clients(self, clients):
+        raise NotImplementedError
 
-    def close(self):
-        self.db.close()
+    def _replace_file(self, dump):
+        tmp_path = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                dump(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.filename)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _locked(self):
+        with self._journal_lock:
+            if self._lock_handle is not None:
+                yield self._lock_handle
+                return
+            with open(self.lock_path, "a+b") as handle:
+                _lock_file(handle)
+                self._lock_handle = handle
+                try:
+                    yield handle
+                finally:
+                    self._lock_handle = None
+                    _unlock_file(handle)
 
-    def get_by_id(self, client_id):
-        result = self.delegate.find_by_id("clients", client_id)
-        if result:
-            row = result[0]
-            return Client(
-                client_id=row[0],
-                last_name=row[1],
-                first_name=row[2],
-                otch=row[3],
-                address=row[4],
-                phone=row[5],
-            )
-        return None
+    @staticmethod
+    def _read_high_water(handle):
+        handle.seek(0)
+        content = handle.read().strip()
+        return int(content) if content.isdigit() else None
 
-    def get_k_n_short_list(self, k, n):
-        offset = (n - 1) * k
-        rows = self.delegate.get_all_paginated("clients", k, offset)
-        short_clients = []
-        for row in rows:
-            client = Client(
-                client_id=row[0],
-                last_name=row[1],
-                first_name=row[2],
-                otch=row[3],
-                address=row[4],
-                phone=row[5],
-            )
-            short_clients.append(client.short())
-        return short_clients
+    @staticmethod
+    def _store_high_water(handle, value):
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(value).encode("ascii"))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    def _allocate_id(self, clients, count=1):
+        with self._locked() as handle:
+            high_water = self._read_high_water(handle)
+            if high_water is None:
+                high_water = super()._allocate_id(clients) - 1
+            self._store_high_water(handle, high_water + count)
+            return high_water + 1
 
     def add_client(self, last_name, first_name, phone, address, otch=None):
-        data = {
-            "last_name": last_name,
-            "first_name": first_name,
-            "phone": phone,
-            "address": address,
-            "otch": otch,
-        }
-        self.delegate.insert("clients", data)
+        with self._locked():
+            return super().add_client(last_name, first_name, phone, address, otch)
 
     def update_client(
         self,
@@ -497,65 +1127,1804 @@ class ClientRepDB:
         address=None,
         otch=None,
     ):
-        current_client = self.get_by_id(client_id)
-        if not current_client:
-            return None
-        updates = {
-            "last_name": (
-                last_name if last_name is not None else current_client.last_name
-            ),
-            "first_name": (
-                first_name if first_name is not None else current_client.first_name
-            ),
-            "phone": phone if phone is not None else current_client.phone,
-            "address": address if address is not None else current_client.address,
-            "otch": otch if otch is not None else current_client.otch,
-        }
-        self.delegate.update("clients", updates, client_id)
-        return self.get_by_id(client_id)
+        with self._locked():
+            return super().update_client(
+                client_id, last_name, first_name, phone, address, otch
+            )
 
     def delete_client(self, client_id):
-        return self.delegate.delete("clients", client_id)
+        with self._locked():
+            return super().delete_client(client_id)
+
+    def append_clients(self, clients, assign_ids=False):
+        with self._locked() as handle:
+            if not super().append_clients(clients, assign_ids):
+                return False
+            high_water = self._read_high_water(handle)
+            top_id = max((client.client_id for client in clients), default=0)
+            if high_water is not None and top_id > high_water:
+                self._store_high_water(handle, top_id)
+            return True
 
-    def get_count(self):
-        return self.delegate.count("clients")
+    @contextmanager
+    def batch(self):
+        with self._locked():
+            with super().batch():
+                yield self
 
+    def _replay_journal(self, clients):
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as file:
+                records = file.readlines()
+        except FileNotFoundError:
+            return clients
+        by_id = {client.client_id: client for client in clients}
+        for line in records:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("op") == "put":
+                client = self._client_from_item(record["client"])
+                by_id[client.client_id] = client
+            elif record.get("op") == "delete":
+                by_id.pop(record.get("client_id"), None)
+        return list(by_id.values())
+
+    def _load_state(self):
+        clients = self._read_clients()
+        self.bytes_read += self._file_size(self.filename)
+        if self.journal:
+            self.bytes_read += self._file_size(self.journal_path)
+            clients = self._replay_journal(clients)
+        return clients
 
-class ClientRepDBAdapter(ClientRep):
-    def __init__(self):
-        super().__init__("")
-        self.adaptee = ClientRepDB()
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def io_counters(self):
+        return {
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "round_trips": 0,
+        }
 
-    def close(self):
-        self.adaptee.close()
+    def _store_cache(self, clients):
+        if self.use_cache:
+            self._cache = list(clients)
+            self._cache_stamp = self._file_stamp()
 
-    def read_all(self):
-        total_clients = self.adaptee.get_count()
-        results = self.adaptee.delegate.get_all_paginated("clients", total_clients, 0)
-        clients = []
-        for row in results:
-            client = Client(
-                client_id=row[0],
-                last_name=row[1],
-                first_name=row[2],
-                otch=row[3],
-                address=row[4],
-                phone=row[5],
-            )
-            clients.append(client)
-        return clients
+    def invalidate_cache(self):
+        self._cache = None
+        self._cache_stamp = None
 
-    def add_client(self, last_name, first_name, phone, address, otch=None):
-        return self.adaptee.add_client(last_name, first_name, phone, address, otch)
+    def reload(self):
+        self.invalidate_cache()
+        return self.read_all()
 
-    def get_count(self):
-        return self.adaptee.get_count()
+    def read_all(self):
+        if self._batch is not None:
+            return list(self._batch)
+        with self._journal_lock:
+            if not self.use_cache:
+                return self._load_state()
+            stamp = self._file_stamp()
+            if self._cache is None or stamp != self._cache_stamp:
+                self._cache = self._load_state()
+                self._cache_stamp = stamp
+            return list(self._cache)
 
-    def get_k_n_short_list(self, k, n):
-        return self.adaptee.get_k_n_short_list(k, n)
+    def write_all(self, clients):
+        with self._locked() as handle:
+            if not self._write_clients(clients):
+                return False
+            self.bytes_written += self._file_size(self.filename)
+            if self.journal:
+                self._truncate_journal()
+            self._store_cache(clients)
+            top_id = max((client.client_id for client in clients), default=0)
+            if top_id > (self._read_high_water(handle) or 0):
+                self._store_high_water(handle, top_id)
+            return True
 
-    def update_client(
-        self,
+    def _truncate_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+
+    def _append_journal(self, clients, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            with self._journal_lock:
+                with open(self.journal_path, "a", encoding="utf-8") as file:
+                    file.write(line)
+                    file.flush()
+                    os.fsync(file.fileno())
+                self.bytes_written += len(line.encode("utf-8"))
+                self._store_cache(clients)
+                self._maybe_compact()
+            return True
+        except OSError:
+            return False
+
+    def _persist_put(self, clients, client):
+        if self._batch is not None or not self.journal:
+            return super()._persist_put(clients, client)
+        return self._append_journal(clients, {"op": "put", "client": client.to_dict()})
+
+    def _persist_delete(self, clients, client_id):
+        if self._batch is not None or not self.journal:
+            return super()._persist_delete(clients, client_id)
+        return self._append_journal(clients, {"op": "delete", "client_id": client_id})
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def _maybe_compact(self):
+        if self.journal_size() < self.compact_threshold:
+            return
+        if not self.background_compaction:
+            self.compact()
+            return
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self):
+        with self._locked():
+            if not self.journal or not os.path.exists(self.journal_path):
+                return True
+            return self.write_all(self.read_all())
+
+    def wait_for_compaction(self, timeout=None):
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+class ClientRepJson(ClientRepFile):
+    def __init__(self, filename, *args, stream_threshold=64 * 1024 * 1024, **options):
+        super().__init__(filename, *args, **options)
+        self.stream_threshold = stream_threshold
+
+    def _read_clients(self):
+        try:
+            with open(self.filename, "r", encoding="utf-8") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return []
+        if not content.strip():
+            return []
+        clients = []
+        for item in json.loads(content):
+            clients.append(self._client_from_item(item))
+        return clients
+
+    def _write_clients(self, clients):
+        try:
+            data = [client.to_dict() for client in clients]
+            self._replace_file(
+                lambda file: json.dump(data, file, ensure_ascii=False, indent=2)
+            )
+            return True
+        except Exception:
+            return False
+
+    def _iter_records(self, chunk_size=64 * 1024):
+        decoder = json.JSONDecoder()
+        with open(self.filename, "r", encoding="utf-8") as file:
+            try:
+                yield from self._iter_buffer(file, decoder, chunk_size)
+            finally:
+                self.bytes_read += file.buffer.tell()
+
+    def _iter_buffer(self, file, decoder, chunk_size):
+        buffer = file.read(chunk_size)
+        if not buffer.strip():
+            return
+        pos = 0
+        started = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                buffer = file.read(chunk_size)
+                pos = 0
+                if not buffer:
+                    raise json.JSONDecodeError("Неожиданный конец файла", "", 0)
+                continue
+            if not started:
+                if buffer[pos] != "[":
+                    raise json.JSONDecodeError("Ожидался массив", buffer, pos)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos >= chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+    def _can_stream(self):
+        if self._batch is not None or self.journal or self._cache_is_fresh():
+            return False
+        if not self.use_cache:
+            return True
+        return self._file_size(self.filename) >= self.stream_threshold
+
+    def _iter_clients(self):
+        try:
+            for item in self._iter_records():
+                yield self._client_from_item(item)
+        except FileNotFoundError:
+            return
+
+    def iter_all(self):
+        if not self._can_stream():
+            return super().iter_all()
+        return self._iter_clients()
+
+    def read_table(self):
+        if not self._can_stream():
+            return super().read_table()
+        table = ClientTable()
+        try:
+            for item in self._iter_records():
+                table.append(*[item.get(field) for field in Client.FIELDS])
+        except FileNotFoundError:
+            return ClientTable()
+        return table
+
+    def get_count(self):
+        if not self._can_stream():
+            return super().get_count()
+        try:
+            return sum(1 for _ in self._iter_records())
+        except FileNotFoundError:
+            return 0
+
+    def get_by_id(self, client_id):
+        if self._indexes_current() or not self._can_stream():
+            return super().get_by_id(client_id)
+        try:
+            for item in self._iter_records():
+                if item.get("client_id") == client_id:
+                    return self._client_from_item(item)
+        except FileNotFoundError:
+            pass
+        return None
+
+    def get_k_n_short_list(self, k, n):
+        start_index = (n - 1) * k
+        if start_index < 0 or not self._can_stream():
+            return super().get_k_n_short_list(k, n)
+        records = itertools.islice(self._iter_records(), start_index, start_index + k)
+        try:
+            return [self._client_from_item(item).short() for item in records]
+        except FileNotFoundError:
+            return []
+
+
+class ClientRepYaml(ClientRepFile):
+    def _read_clients(self):
+        try:
+            with open(self.filename, "r", encoding="utf-8") as file:
+                data = yaml.safe_load(file)
+                if data is None:
+                    return []
+                clients = []
+                for item in data:
+                    clients.append(self._client_from_item(item))
+                return clients
+        except FileNotFoundError:
+            return []
+
+    def _write_clients(self, clients):
+        try:
+            data = [client.to_dict() for client in clients]
+            self._replace_file(
+                lambda file: yaml.dump(
+                    data, file, allow_unicode=True, default_flow_style=False
+                )
+            )
+            return True
+        except Exception:
+            return False
+
+
+def _load_shard_rows(shard_class, filename, options):
+    shard = shard_class(filename, **{**options, "use_cache": False})
+    return [
+        (
+            client.client_id,
+            client.last_name,
+            client.first_name,
+            client.otch,
+            client.address,
+            client.phone,
+        )
+        for client in shard.read_all()
+    ]
+
+
+class ClientRepSharded(ClientRep):
+    SHARD_CLASSES = {"json": ClientRepJson, "yaml": ClientRepYaml}
+
+    def __init__(
+        self,
+        filename,
+        shard_count=4,
+        shard_format="json",
+        strategy="hash",
+        range_size=10000,
+        max_workers=None,
+        parallel_min_bytes=1024 * 1024,
+        indexed_fields=("phone", "last_name"),
+        **shard_options,
+    ):
+        if shard_format not in self.SHARD_CLASSES:
+            raise ValueError(f"Неизвестный формат шардов: {shard_format}")
+        if strategy not in ("hash", "range"):
+            raise ValueError(f"Неизвестная стратегия шардирования: {strategy}")
+        if shard_count < 1 or range_size < 1:
+            raise ValueError(
+                "Число шардов и размер диапазона должны быть положительными"
+            )
+        super().__init__(filename, indexed_fields)
+        self.shard_count = shard_count
+        self.shard_format = shard_format
+        self.strategy = strategy
+        self.range_size = range_size
+        self.max_workers = max_workers
+        self.parallel_min_bytes = parallel_min_bytes
+        self.shard_options = shard_options
+        shard_class = self.SHARD_CLASSES[shard_format]
+        base, ext = os.path.splitext(filename)
+        ext = ext or f".{shard_format}"
+        self.shards = [
+            shard_class(f"{base}.{index}{ext}", **shard_options)
+            for index in range(shard_count)
+        ]
+        self.lock_path = f"{base}.lock"
+        self._lock = threading.RLock()
+        self._lock_handle = None
+
+    def shard_index(self, client_id):
+        if self.strategy == "range":
+            return min((client_id - 1) // self.range_size, self.shard_count - 1)
+        return client_id % self.shard_count
+
+    def shard_for(self, client_id):
+        return self.shards[self.shard_index(client_id)]
+
+    def _data_version(self):
+        return tuple(shard._data_version() for shard in self.shards)
+
+    def io_counters(self):
+        totals = {"bytes_read": 0, "bytes_written": 0, "round_trips": 0}
+        for shard in self.shards:
+            for key, value in shard.io_counters().items():
+                totals[key] += value
+        return totals
+
+    def invalidate_cache(self):
+        for shard in self.shards:
+            shard.invalidate_cache()
+
+    def _load_stale_shards(self):
+        stale = [
+            shard
+            for shard in self.shards
+            if shard.use_cache and not shard._cache_is_fresh()
+        ]
+        size = sum(shard._file_size(shard.filename) for shard in stale)
+        workers = self.max_workers or os.cpu_count() or 1
+        if len(stale) < 2 or workers < 2 or size < self.parallel_min_bytes:
+            return
+        stamps = [shard._file_stamp() for shard in stale]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(
+                        _load_shard_rows,
+                        [type(shard) for shard in stale],
+                        [shard.filename for shard in stale],
+                        [self.shard_options] * len(stale),
+                    )
+                )
+        except (OSError, NotImplementedError):
+            return
+        for shard, stamp, rows in zip(stale, stamps, results):
+            with shard._journal_lock:
+                shard._cache = [Client.from_trusted_row(*row) for row in rows]
+                shard._cache_stamp = stamp
+                shard.bytes_read += shard._file_size(shard.filename)
+
+    def _sorted_shards(self):
+        self._load_stale_shards()
+        result = []
+        for shard in self.shards:
+            clients = shard.read_all()
+            clients.sort(key=lambda client: client.client_id)
+            result.append(clients)
+        return result
+
+    def _merged(self):
+        return heapq.merge(*self._sorted_shards(), key=lambda client: client.client_id)
+
+    def read_all(self):
+        return list(self._merged())
+
+    def write_all(self, clients):
+        parts = [[] for _ in self.shards]
+        for client in clients:
+            parts[self.shard_index(client.client_id)].append(client)
+        with self._locked() as handle:
+            ok = True
+            for shard, part in zip(self.shards, parts):
+                ok = shard.write_all(part) and ok
+            top_id = max((client.client_id for client in clients), default=0)
+            if top_id > (ClientRepFile._read_high_water(handle) or 0):
+                ClientRepFile._store_high_water(handle, top_id)
+            return ok
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._lock_handle is not None:
+                yield self._lock_handle
+                return
+            with open(self.lock_path, "a+b") as handle:
+                _lock_file(handle)
+                self._lock_handle = handle
+                try:
+                    yield handle
+                finally:
+                    self._lock_handle = None
+                    _unlock_file(handle)
+
+    def append_clients(self, clients, assign_ids=False):
+        with self._locked() as handle:
+            if assign_ids:
+                first_id = self._next_id(len(clients))
+                for offset, client in enumerate(clients):
+                    client.set_client_id(first_id + offset)
+            parts = [[] for _ in self.shards]
+            for client in clients:
+                parts[self.shard_index(client.client_id)].append(client)
+            ok = True
+            for shard, part in zip(self.shards, parts):
+                if part:
+                    ok = shard.append_clients(part) and ok
+            high_water = ClientRepFile._read_high_water(handle)
+            top_id = max((client.client_id for client in clients), default=0)
+            if high_water is not None and top_id > high_water:
+                ClientRepFile._store_high_water(handle, top_id)
+            return ok
+
+    def get_by_id(self, client_id):
+        if self._indexes_current():
+            return super().get_by_id(client_id)
+        if not ShortClient.is_valid_id(client_id):
+            return None
+        return self.shard_for(client_id).get_by_id(client_id)
+
+    def get_count(self):
+        return sum(shard.get_count() for shard in self.shards)
+
+    def get_k_n_short_list(self, k, n):
+        start_index = (n - 1) * k
+        if start_index < 0:
+            return []
+        clients = itertools.islice(self._merged(), start_index, start_index + k)
+        return [client.short() for client in clients]
+
+    def _next_id(self, count=1):
+        with self._locked() as handle:
+            high_water = ClientRepFile._read_high_water(handle)
+            if high_water is None:
+                high_water = 0
+                for shard in self.shards:
+                    for client in shard.read_all():
+                        if client.client_id > high_water:
+                            high_water = client.client_id
+            ClientRepFile._store_high_water(handle, high_water + count)
+            return high_water + 1
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "otch": otch,
+            "address": address,
+            "phone": phone,
+        }
+        if Client.validate_fields(data, Client.FIELDS[1:]):
+            return None
+        indexed = self._indexes_current()
+        new_client = Client.from_trusted_row(
+            self._next_id(), last_name, first_name, otch, address, phone
+        )
+        shard = self.shard_for(new_client.client_id)
+        with shard._locked():
+            shard_indexed = shard._indexes_current()
+            clients = shard._working_set()
+            clients.append(new_client)
+            if not shard._persist_put(clients, new_client):
+                return None
+            shard._index_apply(shard_indexed, new_client=new_client)
+        self._index_apply(indexed, new_client=new_client)
+        return new_client
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        if not ShortClient.is_valid_id(client_id):
+            return None
+        indexed = self._indexes_current()
+        shard = self.shard_for(client_id)
+        old_client = shard.get_by_id(client_id)
+        if old_client is None:
+            return None
+        updated_client = shard.update_client(
+            client_id, last_name, first_name, phone, address, otch
+        )
+        if updated_client is not None:
+            self._index_apply(indexed, old_client, updated_client)
+        return updated_client
+
+    def delete_client(self, client_id: int):
+        if not ShortClient.is_valid_id(client_id):
+            return False
+        indexed = self._indexes_current()
+        shard = self.shard_for(client_id)
+        old_client = shard.get_by_id(client_id)
+        if old_client is None or not shard.delete_client(client_id):
+            return False
+        self._index_apply(indexed, old_client=old_client)
+        return True
+
+    @contextmanager
+    def batch(self):
+        if getattr(self._batch_state, "index", None) is not None:
+            yield self
+            return
+        self._begin_batch_index()
+        committed = False
+        try:
+            with self._locked(), ExitStack() as stack:
+                for shard in self.shards:
+                    stack.enter_context(shard.batch())
+                yield self
+            committed = True
+        finally:
+            self._end_batch_index(committed)
+
+
+class ClientRepBinary(ClientRep):
+    MAGIC = b"CLB1"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQQQ")
+    RECORD = struct.Struct("<q10I")
+    INDEX_ENTRY = struct.Struct("<qQ")
+    NULL_LENGTH = 0xFFFFFFFF
+    STRING_FIELDS = ("last_name", "first_name", "otch", "address", "phone")
+
+    def __init__(self, filename, trusted=True, indexed_fields=("phone", "last_name")):
+        super().__init__(filename, indexed_fields)
+        self.trusted = trusted
+        self._file = None
+        self._map = None
+        self._map_stamp = None
+        self._count = 0
+        self._index_offset = 0
+        self._heap_offset = 0
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _data_version(self):
+        return self._file_stamp()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._map_stamp = None
+        self._count = 0
+
+    def _open(self):
+        stamp = self._file_stamp()
+        if self._map_stamp is not None and stamp == self._map_stamp:
+            return self._map
+        self.close()
+        if stamp is None or stamp[1] == 0:
+            return None
+        self._file = open(self.filename, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, index_offset, heap_offset = self.HEADER.unpack_from(
+            self._map, 0
+        )
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError("Некорректный формат бинарного файла клиентов")
+        self._count = count
+        self._index_offset = index_offset
+        self._heap_offset = heap_offset
+        self._map_stamp = stamp
+        return self._map
+
+    def _record(self, position):
+        return self.RECORD.unpack_from(
+            self._map, self.HEADER.size + position * self.RECORD.size
+        )
+
+    def _string(self, offset, length):
+        if length == self.NULL_LENGTH:
+            return None
+        start = self._heap_offset + offset
+        return str(self._map[start : start + length], "utf-8")
+
+    def _client_at(self, position):
+        record = self._record(position)
+        values = [
+            self._string(record[i], record[i + 1]) for i in range(1, len(record), 2)
+        ]
+        last_name, first_name, otch, address, phone = values
+        if self.trusted:
+            return Client.from_trusted_row(
+                record[0], last_name, first_name, otch, address, phone
+            )
+        return Client(
+            client_id=record[0],
+            last_name=last_name,
+            first_name=first_name,
+            otch=otch,
+            address=address,
+            phone=phone,
+        )
+
+    def _short_at(self, position):
+        record = self._record(position)
+        return ShortClient(
+            client_id=record[0],
+            last_name=self._string(record[1], record[2]),
+            first_name=self._string(record[3], record[4]),
+            phone=self._string(record[9], record[10]),
+        )
+
+    def _find_position(self, client_id):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, position = self.INDEX_ENTRY.unpack_from(
+                self._map, self._index_offset + middle * self.INDEX_ENTRY.size
+            )
+            if entry_id == client_id:
+                return position
+            if entry_id < client_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def get_count(self):
+        return self._count if self._open() is not None else 0
+
+    def get_by_id(self, client_id):
+        if self._open() is None:
+            return None
+        position = self._find_position(client_id)
+        return self._client_at(position) if position is not None else None
+
+    def get_k_n_short_list(self, k, n):
+        if self._open() is None:
+            return []
+        start_index = max((n - 1) * k, 0)
+        end_index = min(start_index + k, self._count)
+        return [self._short_at(i) for i in range(start_index, end_index)]
+
+    def iter_all(self):
+        if self._open() is None:
+            return
+        for position in range(self._count):
+            yield self._client_at(position)
+
+    def read_all(self):
+        return list(self.iter_all())
+
+    def write_all(self, clients):
+        try:
+            records = bytearray()
+            heap = bytearray()
+            heap_positions = {}
+            entries = []
+            for position, client in enumerate(clients):
+                fields = []
+                for field in self.STRING_FIELDS:
+                    value = getattr(client, field)
+                    if value is None:
+                        fields.extend((0, self.NULL_LENGTH))
+                        continue
+                    if value not in heap_positions:
+                        data = value.encode("utf-8")
+                        heap_positions[value] = (len(heap), len(data))
+                        heap += data
+                    fields.extend(heap_positions[value])
+                records += self.RECORD.pack(client.client_id, *fields)
+                entries.append((client.client_id, position))
+            entries.sort()
+            index = b"".join(self.INDEX_ENTRY.pack(*entry) for entry in entries)
+            index_offset = self.HEADER.size + len(records)
+            heap_offset = index_offset + len(index)
+            header = self.HEADER.pack(
+                self.MAGIC, self.VERSION, 0, len(entries), index_offset, heap_offset
+            )
+            temp_name = f"{self.filename}.tmp"
+            with open(temp_name, "wb") as file:
+                file.write(header)
+                file.write(records)
+                file.write(index)
+                file.write(heap)
+            self.close()
+            os.replace(temp_name, self.filename)
+            return True
+        except Exception:
+            return False
+
+
+class PoolTimeoutError(TimeoutError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(
+        self, connect, min_size=1, max_size=10, timeout=30.0, ping_after=30.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула соединений")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle_count(self):
+        return len(self._idle)
+
+    def _is_healthy(self, connection, last_used):
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise psycopg2.InterfaceError("Пул соединений закрыт")
+                    if self._idle:
+                        connection, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            "Не удалось получить соединение из пула за отведенное время"
+                        )
+                    self._condition.wait(remaining)
+            if connection is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            if self._is_healthy(connection, last_used):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, broken=False):
+        if not broken and not connection.closed:
+            try:
+                if (
+                    connection.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    connection.rollback()
+            except psycopg2.Error:
+                broken = True
+        if broken or connection.closed or self._closed:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        connection = self.acquire(timeout)
+        broken = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(connection, broken)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+class DatabaseSingleton:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(
+        cls,
+        host="localhost",
+        user="postgres",
+        password="123",
+        database="clients_database",
+        port="5432",
+        min_size=1,
+        max_size=10,
+        timeout=30.0,
+    ):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance._initialize(
+                    host, user, password, database, port, min_size, max_size, timeout
+                )
+                cls._instance = instance
+        return cls._instance
+
+    def _initialize(
+        self, host, user, password, database, port, min_size, max_size, timeout
+    ):
+        self.pool = ConnectionPool(
+            lambda: psycopg2.connect(
+                host=host, user=user, password=password, database=database, port=port
+            ),
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+        )
+        self._local = threading.local()
+        self._prepared = {}
+        self._prepared_lock = threading.Lock()
+
+    def connection(self, timeout=None):
+        return self.pool.connection(timeout)
+
+    @staticmethod
+    def _statement_name(query):
+        return "client_stmt_" + hashlib.md5(query.encode("utf-8")).hexdigest()[:16]
+
+    def _run_prepared(self, connection, query, params, fetch):
+        name = self._statement_name(query)
+        key = (id(connection), connection.get_backend_pid())
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(key, set())
+        statements = 1
+        with connection.cursor() as cursor:
+            if name not in prepared:
+                parts = query.split("%s")
+                body = parts[0] + "".join(
+                    f"${position}{part}" for position, part in enumerate(parts[1:], 1)
+                )
+                cursor.execute(f"PREPARE {name} AS {body}")
+                prepared.add(name)
+                statements += 1
+            arguments = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({arguments})", params)
+            return (cursor.fetchall() if fetch else cursor.rowcount), statements
+
+    def execute_prepared(self, query, params, fetch=False):
+        bound = self._bound_connection()
+        if bound is not None:
+            return self._run_prepared(bound, query, params, fetch)
+        with self.pool.connection() as connection:
+            connection.autocommit = True
+            try:
+                return self._run_prepared(connection, query, params, fetch)
+            finally:
+                connection.autocommit = False
+
+    def _bound_connection(self):
+        return getattr(self._local, "connection", None)
+
+    def execute_query(self, query, params=None, fetch=False):
+        bound = self._bound_connection()
+        if bound is not None:
+            with bound.cursor() as cursor:
+                cursor.execute(query, params or ())
+                return cursor.fetchall() if fetch else cursor.rowcount
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params or ())
+                result = cursor.fetchall() if fetch else cursor.rowcount
+            connection.commit()
+        return result
+
+    def iter_query(self, query, params=None, itersize=2000):
+        bound = self._bound_connection()
+        if bound is not None:
+            cursor = bound.cursor(name=f"stream_{uuid.uuid4().hex}")
+            cursor.itersize = itersize
+            try:
+                cursor.execute(query, params or ())
+                yield from cursor
+            finally:
+                cursor.close()
+            return
+        with self.pool.connection() as connection:
+            cursor = connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+            cursor.itersize = itersize
+            try:
+                cursor.execute(query, params or ())
+                for row in cursor:
+                    yield row
+            finally:
+                cursor.close()
+                connection.rollback()
+
+    @contextmanager
+    def transaction(self):
+        bound = self._bound_connection()
+        if bound is not None:
+            with bound.cursor() as cursor:
+                yield cursor
+            return
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            self._local.connection = connection
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                self._local.connection = None
+                cursor.close()
+
+    def close(self):
+        with DatabaseSingleton._instance_lock:
+            self.pool.close()
+            if DatabaseSingleton._instance is self:
+                DatabaseSingleton._instance = None
+
+
+class DatabaseDelegate:
+    def __init__(self, db_connector):
+        self.db = db_connector
+        self.round_trips = 0
+
+    def _execute(self, sql, params=None, fetch=False):
+        self.round_trips += 1
+        return self.db.execute_query(sql, params, fetch)
+
+    def _execute_prepared(self, sql, params, fetch=False):
+        result, statements = self.db.execute_prepared(sql, params, fetch)
+        self.round_trips += statements
+        return result
+
+    def find_by_id(self, table, id_value):
+        sql = f"SELECT * FROM {table} WHERE client_id = %s"
+        return self._execute_prepared(sql, [id_value], fetch=True)
+
+    def find_by(self, table, column, value):
+        sql = f"SELECT * FROM {table} WHERE {column} = %s ORDER BY client_id"
+        return self._execute(sql, [value], fetch=True)
+
+    def get_all_paginated(self, table, limit, offset):
+        sql = f"SELECT * FROM {table} ORDER BY client_id LIMIT %s OFFSET %s"
+        return self._execute(sql, [limit, offset], fetch=True)
+
+    def get_page_after(self, table, limit, after_id=None):
+        if after_id is None:
+            sql = f"SELECT * FROM {table} ORDER BY client_id LIMIT %s"
+            return self._execute(sql, [limit], fetch=True)
+        sql = f"SELECT * FROM {table} WHERE client_id > %s ORDER BY client_id LIMIT %s"
+        return self._execute(sql, [after_id, limit], fetch=True)
+
+    def insert(self, table, data):
+        columns = ", ".join(data.keys())
+        values_placeholder = ", ".join(["%s"] * len(data))
+        sql = (
+            f"INSERT INTO {table} ({columns}) VALUES ({values_placeholder}) "
+            f"RETURNING *"
+        )
+        return self._execute_prepared(sql, list(data.values()), fetch=True)
+
+    def update(self, table, updates, id_value):
+        set_expr = ", ".join([f"{key} = %s" for key in updates.keys()])
+        sql = f"UPDATE {table} SET {set_expr} WHERE client_id = %s RETURNING *"
+        params = list(updates.values()) + [id_value]
+        return self._execute_prepared(sql, params, fetch=True)
+
+    def delete(self, table, id_value):
+        sql = f"DELETE FROM {table} WHERE client_id = %s"
+        return self._execute_prepared(sql, [id_value])
+
+    def count(self, table):
+        sql = f"SELECT COUNT(*) FROM {table}"
+        result = self._execute(sql, fetch=True)
+        return result[0][0] if result else 0
+
+    def select_where(self, table, where, params, order, limit=None, offset=None):
+        sql = f"SELECT * FROM {table}{where}{order}"
+        params = list(params)
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        if offset:
+            sql += " OFFSET %s"
+            params.append(offset)
+        return self._execute(sql, params, fetch=True)
+
+    def search_prefix(self, table, columns, prefix, limit=None):
+        pattern = (
+            prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            + "%"
+        )
+        keys = [f"lower(translate({column}, 'Ёё', 'Ее'))" for column in columns]
+        where = " OR ".join(f"{key} LIKE %s" for key in keys)
+        order = ", ".join(f"CASE WHEN {key} LIKE %s THEN {key} END" for key in keys)
+        sql = f"SELECT * FROM {table} WHERE {where} ORDER BY LEAST({order}), client_id"
+        params = [pattern] * (len(keys) * 2)
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return self._execute(sql, params, fetch=True)
+
+    def iter_where(
+        self, table, where="", params=(), order=" ORDER BY client_id", itersize=2000
+    ):
+        sql = f"SELECT * FROM {table}{where}{order}"
+        self.round_trips += 1
+        for position, row in enumerate(
+            self.db.iter_query(sql, list(params), itersize), 1
+        ):
+            if position % itersize == 0:
+                self.round_trips += 1
+            yield row
+
+    def count_where(self, table, where, params):
+        sql = f"SELECT COUNT(*) FROM {table}{where}"
+        result = self._execute(sql, list(params), fetch=True)
+        return result[0][0] if result else 0
+
+    def insert_many(self, table, columns, rows, page_size=1000):
+        column_list = ", ".join(columns)
+        sql = f"INSERT INTO {table} ({column_list}) VALUES %s RETURNING client_id"
+        self.round_trips += -(-len(rows) // page_size)
+        with self.db.transaction() as cursor:
+            result = psycopg2.extras.execute_values(
+                cursor, sql, rows, page_size=page_size, fetch=True
+            )
+        return [row[0] for row in result]
+
+    @staticmethod
+    def _copy_value(value):
+        if value is None:
+            return "\\N"
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    def copy_insert_many(self, table, columns, rows):
+        column_list = ", ".join(columns)
+        buffer = io.StringIO()
+        for position, row in enumerate(rows):
+            values = [str(position)] + [self._copy_value(value) for value in row]
+            buffer.write("\t".join(values) + "\n")
+        buffer.seek(0)
+        staging = f"bulk_{table}_{uuid.uuid4().hex}"
+        self.round_trips += 4
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT 0 AS position, {column_list} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY {staging} (position, {column_list}) FROM STDIN", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) "
+                f"SELECT {column_list} FROM {staging} ORDER BY position "
+                f"RETURNING client_id"
+            )
+            result = cursor.fetchall()
+            cursor.execute(f"DROP TABLE {staging}")
+        return [row[0] for row in result]
+
+    def update_many(self, table, columns, rows, page_size=1000):
+        set_expr = ", ".join(
+            [f"{column} = COALESCE(v.{column}, t.{column})" for column in columns]
+        )
+        column_list = ", ".join(columns)
+        template = "(%s::integer" + ", %s" * len(columns) + ")"
+        sql = (
+            f"UPDATE {table} AS t SET {set_expr} "
+            f"FROM (VALUES %s) AS v (client_id, {column_list}) "
+            f"WHERE t.client_id = v.client_id RETURNING t.client_id"
+        )
+        self.round_trips += -(-len(rows) // page_size)
+        with self.db.transaction() as cursor:
+            result = psycopg2.extras.execute_values(
+                cursor, sql, rows, template=template, page_size=page_size, fetch=True
+            )
+        return [row[0] for row in result]
+
+    def delete_many(self, table, id_values):
+        sql = f"DELETE FROM {table} WHERE client_id = ANY(%s) RETURNING client_id"
+        self.round_trips += 1
+        with self.db.transaction() as cursor:
+            cursor.execute(sql, [list(id_values)])
+            result = cursor.fetchall()
+        return [row[0] for row in result]
+
+
+class BulkOutcome:
+    def __init__(self, ok, client_id=None, error=None):
+        self.ok = ok
+        self.client_id = client_id
+        self.error = error
+
+    def __repr__(self):
+        return (
+            f"BulkOutcome(ok={self.ok}, client_id={self.client_id}, "
+            f"error={self.error!r})"
+        )
+
+
+class ClientRepDB:
+    PAGE_BOUNDARY_LIMIT = 1024
+
+    def __init__(self, trusted=False):
+        self.db = DatabaseSingleton()
+        self.delegate = DatabaseDelegate(self.db)
+        self.trusted = trusted
+        self._page_boundaries = {}
+        self._page_boundaries_lock = threading.Lock()
+
+    def close(self):
+        self.db.close()
+
+    def _client_from_row(self, row):
+        if self.trusted:
+            return Client.from_trusted_row(*row[:6])
+        return Client(
+            client_id=row[0],
+            last_name=row[1],
+            first_name=row[2],
+            otch=row[3],
+            address=row[4],
+            phone=row[5],
+        )
+
+    def get_by_id(self, client_id):
+        result = self.delegate.find_by_id("clients", client_id)
+        if result:
+            return self._client_from_row(result[0])
+        return None
+
+    def find_by_field(self, field, value):
+        if field not in Client.FIELDS:
+            raise ValueError(f"Неизвестное поле клиента: {field}")
+        rows = self.delegate.find_by("clients", field, value)
+        return [self._client_from_row(row) for row in rows]
+
+    def search_prefix(self, prefix, limit=20):
+        rows = self.delegate.search_prefix(
+            "clients", ClientRep.PREFIX_FIELDS, ClientRep._prefix_key(prefix), limit
+        )
+        return [self._client_from_row(row) for row in rows]
+
+    @staticmethod
+    def encode_cursor(client_id):
+        payload = json.dumps({"after": client_id}).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            after_id = payload["after"]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise ValueError("Некорректный курсор страницы")
+        if not isinstance(after_id, int):
+            raise ValueError("Некорректный курсор страницы")
+        return after_id
+
+    def _remember_page_boundary(self, k, n, last_id):
+        with self._page_boundaries_lock:
+            self._page_boundaries[(k, n)] = last_id
+            if len(self._page_boundaries) > self.PAGE_BOUNDARY_LIMIT:
+                self._page_boundaries.pop(next(iter(self._page_boundaries)), None)
+
+    def _forget_page_boundaries(self):
+        with self._page_boundaries_lock:
+            self._page_boundaries.clear()
+
+    @contextmanager
+    def batch(self):
+        try:
+            with self.db.transaction():
+                yield self
+        except BaseException:
+            self._forget_page_boundaries()
+            raise
+
+    def get_k_n_short_list(self, k, n):
+        with self._page_boundaries_lock:
+            after_id = self._page_boundaries.get((k, n - 1))
+        if n == 1 or after_id is not None:
+            rows = self.delegate.get_page_after("clients", k, after_id)
+        else:
+            offset = (n - 1) * k
+            rows = self.delegate.get_all_paginated("clients", k, offset)
+        if n >= 1 and len(rows) == k and k > 0:
+            self._remember_page_boundary(k, n, rows[-1][0])
+        short_clients = []
+        for row in rows:
+            client = self._client_from_row(row)
+            short_clients.append(client.short())
+        return short_clients
+
+    def get_k_short_list_after(self, k, cursor=None):
+        after_id = self.decode_cursor(cursor) if cursor is not None else None
+        rows = self.delegate.get_page_after("clients", k, after_id)
+        short_clients = [self._client_from_row(row).short() for row in rows]
+        next_cursor = None
+        if rows and len(rows) == k:
+            next_cursor = self.encode_cursor(rows[-1][0])
+        return short_clients, next_cursor
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "phone": phone,
+            "address": address,
+            "otch": otch,
+        }
+        if Client.validate_fields(data, self.BULK_COLUMNS):
+            return None
+        self._forget_page_boundaries()
+        rows = self.delegate.insert("clients", data)
+        return self._client_from_row(rows[0]) if rows else None
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "phone": phone,
+            "address": address,
+            "otch": otch,
+        }
+        if Client.validate_fields(data, self.BULK_COLUMNS, partial=True):
+            return None
+        updates = {key: value for key, value in data.items() if value is not None}
+        if not updates:
+            return self.get_by_id(client_id)
+        rows = self.delegate.update("clients", updates, client_id)
+        return self._client_from_row(rows[0]) if rows else None
+
+    def delete_client(self, client_id):
+        self._forget_page_boundaries()
+        return self.delegate.delete("clients", client_id) > 0
+
+    def get_count(self):
+        return self.delegate.count("clients")
+
+    def query_clients(self, spec, limit=None, offset=None):
+        where, params = spec.where_sql()
+        rows = self.delegate.select_where(
+            "clients", where, params, spec.order_sql(), limit, offset
+        )
+        return [self._client_from_row(row) for row in rows]
+
+    def query_count(self, spec):
+        where, params = spec.where_sql()
+        return self.delegate.count_where("clients", where, params)
+
+    def iter_rows(self, spec=None, itersize=2000):
+        if spec is None:
+            return self.delegate.iter_where("clients", itersize=itersize)
+        where, params = spec.where_sql()
+        return self.delegate.iter_where(
+            "clients", where, params, spec.order_sql(), itersize
+        )
+
+    def iter_clients(self, spec=None, itersize=2000):
+        for row in self.iter_rows(spec, itersize):
+            yield self._client_from_row(row)
+
+    def read_table(self, spec=None, itersize=2000):
+        table = ClientTable()
+        for row in self.iter_rows(spec, itersize):
+            table.append(*row[:6])
+        return table
+
+    BULK_COLUMNS = ("last_name", "first_name", "phone", "address", "otch")
+
+    def _validate_row(self, row, partial=False):
+        errors = Client.validate_fields(row, self.BULK_COLUMNS, partial)
+        if errors:
+            raise ValueError("; ".join(errors))
+
+    def add_clients_bulk(self, rows, use_copy=False, page_size=1000):
+        self._forget_page_boundaries()
+        outcomes = []
+        valid_rows = []
+        for row in rows:
+            try:
+                self._validate_row(row)
+            except ValueError as e:
+                outcomes.append(BulkOutcome(False, error=str(e)))
+                continue
+            outcomes.append(None)
+            valid_rows.append([row.get(column) for column in self.BULK_COLUMNS])
+        if valid_rows:
+            if use_copy:
+                new_ids = self.delegate.copy_insert_many(
+                    "clients", self.BULK_COLUMNS, valid_rows
+                )
+            else:
+                new_ids = self.delegate.insert_many(
+                    "clients", self.BULK_COLUMNS, valid_rows, page_size
+                )
+        else:
+            new_ids = []
+        new_ids = iter(new_ids)
+        return [
+            outcome if outcome is not None else BulkOutcome(True, next(new_ids))
+            for outcome in outcomes
+        ]
+
+    def update_clients_bulk(self, rows, page_size=1000):
+        outcomes = []
+        valid_rows = []
+        for row in rows:
+            client_id = row.get("client_id")
+            try:
+                if not ShortClient.is_valid_id(client_id):
+                    raise ValueError("ID клиента должно быть положительным числом")
+                self._validate_row(row, partial=True)
+            except ValueError as e:
+                outcomes.append(BulkOutcome(False, client_id, str(e)))
+                continue
+            outcomes.append(None)
+            valid_rows.append(
+                [client_id] + [row.get(column) for column in self.BULK_COLUMNS]
+            )
+        updated_ids = set()
+        if valid_rows:
+            updated_ids = set(
+                self.delegate.update_many(
+                    "clients", self.BULK_COLUMNS, valid_rows, page_size
+                )
+            )
+        result = []
+        for outcome, row in zip(outcomes, rows):
+            if outcome is None:
+                client_id = row.get("client_id")
+                if client_id in updated_ids:
+                    outcome = BulkOutcome(True, client_id)
+                else:
+                    outcome = BulkOutcome(False, client_id, "Клиент не найден")
+            result.append(outcome)
+        return result
+
+    def delete_clients_bulk(self, client_ids):
+        client_ids = list(client_ids)
+        self._forget_page_boundaries()
+        deleted_ids = set(self.delegate.delete_many("clients", client_ids))
+        return [
+            BulkOutcome(True, client_id)
+            if client_id in deleted_ids
+            else BulkOutcome(False, client_id, "Клиент не найден")
+            for client_id in client_ids
+        ]
+
+
+class ClientRepDBAdapter(ClientRep):
+    native_queries = True
+    generates_ids = True
+
+    def __init__(self, itersize=2000, trusted=False):
+        super().__init__("")
+        self.adaptee = ClientRepDB(trusted)
+        self.itersize = itersize
+
+    def close(self):
+        self.adaptee.close()
+
+    def read_all(self):
+        return list(self.iter_all())
+
+    def iter_all(self):
+        return self.adaptee.iter_clients(itersize=self.itersize)
+
+    def iter_query(self, spec):
+        return self.adaptee.iter_clients(spec, self.itersize)
+
+    def read_table(self):
+        return self.adaptee.read_table(itersize=self.itersize)
+
+    def get_by_id(self, client_id):
+        return self.adaptee.get_by_id(client_id)
+
+    def find_by_field(self, field, value):
+        return self.adaptee.find_by_field(field, value)
+
+    def _iter_prefix(self, prefix):
+        return iter(self.adaptee.search_prefix(prefix, None))
+
+    def search_prefix(self, prefix, limit=20):
+        return self.adaptee.search_prefix(prefix, limit)
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        return self.adaptee.add_client(last_name, first_name, phone, address, otch)
+
+    def get_count(self):
+        return self.adaptee.get_count()
+
+    def get_k_n_short_list(self, k, n):
+        return self.adaptee.get_k_n_short_list(k, n)
+
+    def get_k_short_list_after(self, k, cursor=None):
+        return self.adaptee.get_k_short_list_after(k, cursor)
+
+    def io_counters(self):
+        return {
+            "bytes_read": 0,
+            "bytes_written": 0,
+            "round_trips": self.adaptee.delegate.round_trips,
+        }
+
+    def query(self, spec):
+        return self.adaptee.query_clients(spec)
+
+    def query_count(self, spec):
+        return self.adaptee.query_count(spec)
+
+    def query_page(self, spec, k, n):
+        offset = max((n - 1) * k, 0)
+        clients = self.adaptee.query_clients(spec, k, offset)
+        return [client.short() for client in clients]
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        return self.adaptee.update_client(
+            client_id, last_name, first_name, phone, address, otch
+        )
+
+    def delete_client(self, client_id):
+        return self.adaptee.delete_client(client_id)
+
+    def add_clients_bulk(self, rows, use_copy=False, page_size=1000):
+        return self.adaptee.add_clients_bulk(rows, use_copy, page_size)
+
+    def update_clients_bulk(self, rows, page_size=1000):
+        return self.adaptee.update_clients_bulk(rows, page_size)
+
+    def delete_clients_bulk(self, client_ids):
+        return self.adaptee.delete_clients_bulk(client_ids)
+
+    @contextmanager
+    def batch(self):
+        with self.adaptee.batch():
+            yield self
+
+    def append_clients(self, clients, assign_ids=False):
+        if not assign_ids:
+            raise ValueError("Идентификаторы клиентов назначает база данных")
+        outcomes = self.adaptee.add_clients_bulk(
+            [client.to_dict() for client in clients], use_copy=True
+        )
+        return all(outcome.ok for outcome in outcomes)
+
+
+class ClientRepSQLite(ClientRep):
+    native_queries = True
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS clients ("
+        "client_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "last_name TEXT NOT NULL, "
+        "first_name TEXT NOT NULL, "
+        "otch TEXT, "
+        "address TEXT NOT NULL, "
+        "phone TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS clients_phone_idx ON clients (phone)",
+        "CREATE INDEX IF NOT EXISTS clients_last_name_idx ON clients (last_name)",
+    )
+    COLUMNS = ("last_name", "first_name", "otch", "address", "phone")
+
+    def __init__(self, filename, trusted=True, timeout=30.0):
+        super().__init__(filename)
+        self.trusted = trusted
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._version_connection = None
+        self._version_lock = threading.Lock()
+        with self.transaction() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.filename, timeout=self.timeout, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self._connection()
+        if getattr(self._local, "in_batch", False):
+            yield connection
+            return
+        with connection:
+            yield connection
+
+    @contextmanager
+    def batch(self):
+        if getattr(self._local, "in_batch", False):
+            yield self
+            return
+        connection = self._connection()
+        self._local.in_batch = True
+        self._begin_batch_index()
+        committed = False
+        try:
+            with connection:
+                yield self
+            committed = True
+        finally:
+            self._local.in_batch = False
+            self._end_batch_index(committed)
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        with self._version_lock:
+            if self._version_connection is not None:
+                connections.append(self._version_connection)
+                self._version_connection = None
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def _fetch(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    def _data_version(self):
+        with self._version_lock:
+            if self._version_connection is None:
+                self._version_connection = sqlite3.connect(
+                    self.filename, timeout=self.timeout, check_same_thread=False
+                )
+            return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _client_from_row(self, row):
+        if self.trusted:
+            return Client.from_trusted_row(*row)
+        return Client(
+            client_id=row[0],
+            last_name=row[1],
+            first_name=row[2],
+            otch=row[3],
+            address=row[4],
+            phone=row[5],
+        )
+
+    def read_all(self):
+        return list(self.iter_all())
+
+    def iter_all(self):
+        cursor = self._connection().execute("SELECT * FROM clients ORDER BY client_id")
+        for row in cursor:
+            yield self._client_from_row(row)
+
+    def read_table(self):
+        table = ClientTable()
+        cursor = self._connection().execute("SELECT * FROM clients ORDER BY client_id")
+        for row in cursor:
+            table.append(*row)
+        return table
+
+    @staticmethod
+    def _insert_clients(connection, clients, keep_ids=True):
+        connection.executemany(
+            "INSERT INTO clients (client_id, last_name, first_name, otch, "
+            "address, phone) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    client.client_id if keep_ids else None,
+                    client.last_name,
+                    client.first_name,
+                    client.otch,
+                    client.address,
+                    client.phone,
+                )
+                for client in clients
+            ],
+        )
+
+    def write_all(self, clients):
+        try:
+            with self.transaction() as connection:
+                connection.execute("DELETE FROM clients")
+                self._insert_clients(connection, clients)
+            return True
+        except sqlite3.Error:
+            return False
+
+    def append_clients(self, clients, assign_ids=False):
+        try:
+            with self.transaction() as connection:
+                self._insert_clients(connection, clients, not assign_ids)
+            return True
+        except sqlite3.Error:
+            return False
+
+    def get_by_id(self, client_id):
+        rows = self._fetch("SELECT * FROM clients WHERE client_id = ?", (client_id,))
+        return self._client_from_row(rows[0]) if rows else None
+
+    def find_by_field(self, field, value):
+        if field not in Client.FIELDS:
+            raise ValueError(f"Неизвестное поле клиента: {field}")
+        rows = self._fetch(
+            f"SELECT * FROM clients WHERE {field} = ? ORDER BY client_id", (value,)
+        )
+        return [self._client_from_row(row) for row in rows]
+
+    def sort_by_field(self, field="last_name", reverse=False):
+        return self.query(ClientQuery(order_by=[f"-{field}" if reverse else field]))
+
+    def get_k_n_short_list(self, k, n):
+        offset = max((n - 1) * k, 0)
+        rows = self._fetch(
+            "SELECT * FROM clients ORDER BY client_id LIMIT ? OFFSET ?", (k, offset)
+        )
+        return [self._client_from_row(row).short() for row in rows]
+
+    def get_count(self):
+        return self._fetch("SELECT COUNT(*) FROM clients")[0][0]
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "otch": otch,
+            "address": address,
+            "phone": phone,
+        }
+        if Client.validate_fields(data, self.COLUMNS):
+            return None
+        indexed = self._indexes_current()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO clients (last_name, first_name, otch, address, phone) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [data[column] for column in self.COLUMNS],
+            )
+        client = Client.from_trusted_row(cursor.lastrowid, *data.values())
+        self._index_apply(indexed, new_client=client)
+        return client
+
+    def update_client(
+        self,
         client_id,
         last_name=None,
         first_name=None,
@@ -563,12 +2932,225 @@ class ClientRepDBAdapter(ClientRep):
         address=None,
         otch=None,
     ):
-        return self.adaptee.update_client(
-            client_id, last_name, first_name, phone, address, otch
+        data = {
+            "last_name": last_name,
+            "first_name": first_name,
+            "otch": otch,
+            "address": address,
+            "phone": phone,
+        }
+        if Client.validate_fields(data, self.COLUMNS, partial=True):
+            return None
+        set_expr = ", ".join(
+            [f"{column} = COALESCE(?, {column})" for column in self.COLUMNS]
         )
+        indexed = self._indexes_current()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE clients SET {set_expr} WHERE client_id = ?",
+                [data[column] for column in self.COLUMNS] + [client_id],
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = connection.execute(
+                "SELECT * FROM clients WHERE client_id = ?", (client_id,)
+            ).fetchone()
+        client = self._client_from_row(row)
+        if indexed:
+            self._index_apply(indexed, self._primary_index.get(client_id), client)
+        return client
 
     def delete_client(self, client_id):
-        return self.adaptee.delete_client(client_id)
+        indexed = self._indexes_current()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "DELETE FROM clients WHERE client_id = ?", (client_id,)
+            )
+        if cursor.rowcount == 0:
+            return False
+        if indexed:
+            self._index_apply(indexed, old_client=self._primary_index.get(client_id))
+        return True
+
+    def _select(self, spec, limit=None, offset=None):
+        where, params = spec.where_sql("sqlite")
+        sql = f"SELECT * FROM clients{where}{spec.order_sql('sqlite')}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit, offset or 0]
+        return self._connection().execute(sql, params)
+
+    def query(self, spec):
+        return [self._client_from_row(row) for row in self._select(spec)]
+
+    def iter_query(self, spec):
+        for row in self._select(spec):
+            yield self._client_from_row(row)
+
+    def query_count(self, spec):
+        where, params = spec.where_sql("sqlite")
+        return self._fetch(f"SELECT COUNT(*) FROM clients{where}", params)[0][0]
+
+    def query_page(self, spec, k, n):
+        offset = max((n - 1) * k, 0)
+        return [
+            self._client_from_row(row).short() for row in self._select(spec, k, offset)
+        ]
+
+
+def _parse_client_lines(lines, first_line_number):
+    rows = []
+    rejected = []
+    for line_number, line in enumerate(lines, first_line_number):
+        if not line.strip():
+            continue
+        try:
+            client = Client(data=line)
+        except ValueError as e:
+            rejected.append((line_number, str(e)))
+            continue
+        except (TypeError, AttributeError):
+            rejected.append((line_number, "Некорректный формат строки"))
+            continue
+        rows.append(
+            (
+                line_number,
+                client.client_id,
+                client.last_name,
+                client.first_name,
+                client.otch,
+                client.address,
+                client.phone,
+            )
+        )
+    return rows, rejected
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.failed = 0
+        self.rejected = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (
+            f"ImportReport(rows_read={self.rows_read}, imported={self.imported}, "
+            f"rejected={len(self.rejected)}, failed={self.failed}, "
+            f"rows_per_second={self.rows_per_second:.0f})"
+        )
+
+
+class ClientImporter:
+    def __init__(
+        self,
+        repo,
+        chunk_size=10000,
+        batch_size=50000,
+        max_workers=None,
+        keep_ids=False,
+        skip_header=False,
+        progress=None,
+        logger=None,
+    ):
+        if chunk_size < 1 or batch_size < 1:
+            raise ValueError("Размер блока и пакета должен быть положительным")
+        if keep_ids and repo.generates_ids:
+            raise ValueError("Репозиторий сам назначает идентификаторы клиентов")
+        self.repo = repo
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.keep_ids = keep_ids
+        self.skip_header = skip_header
+        self.progress = progress
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _read_chunks(self, path):
+        with open(path, "r", encoding="utf-8") as file:
+            line_number = 1
+            if self.skip_header:
+                next(file, None)
+                line_number = 2
+            while True:
+                lines = list(itertools.islice(file, self.chunk_size))
+                if not lines:
+                    return
+                yield line_number, lines
+                line_number += len(lines)
+
+    def _parse_chunks(self, chunks):
+        workers = self.max_workers or os.cpu_count() or 1
+        if workers < 2:
+            for line_number, lines in chunks:
+                yield _parse_client_lines(lines, line_number)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for line_number, lines in chunks:
+                pending.append(executor.submit(_parse_client_lines, lines, line_number))
+                if len(pending) >= workers * 2:
+                    yield pending.pop(0).result()
+            while pending:
+                yield pending.pop(0).result()
+
+    def _flush(self, batch, report):
+        if self.repo.append_clients(batch, not self.keep_ids):
+            report.imported += len(batch)
+        else:
+            report.failed += len(batch)
+        report.elapsed = time.perf_counter() - report.started
+        if self.progress is not None:
+            self.progress(report)
+        else:
+            self.logger.info(
+                "Импортировано %d из %d строк (%.0f строк/с)",
+                report.imported,
+                report.rows_read,
+                report.rows_per_second,
+            )
+
+    def run(self, path):
+        report = ImportReport()
+        known_ids = None
+        if self.keep_ids:
+            known_ids = {client.client_id for client in self.repo.iter_all()}
+        batch = []
+        for rows, rejected in self._parse_chunks(self._read_chunks(path)):
+            report.rows_read += len(rows) + len(rejected)
+            report.rejected.extend(rejected)
+            for line_number, *row in rows:
+                if known_ids is None:
+                    row[0] = None
+                elif row[0] in known_ids:
+                    report.rejected.append(
+                        (line_number, f"client_id: {row[0]} уже существует")
+                    )
+                    continue
+                else:
+                    known_ids.add(row[0])
+                batch.append(Client.from_trusted_row(*row))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, report)
+                batch = []
+        if batch:
+            self._flush(batch, report)
+        report.elapsed = time.perf_counter() - report.started
+        return report
+
+
+def russian_collation_key(value):
+    if value is None:
+        return (True, "", "", "")
+    value = str(value)
+    lowered = value.lower()
+    return (False, lowered.replace("ё", "е"), lowered, value.swapcase())
 
 
 class ClientRepDecorator(ClientRep):
@@ -579,15 +3161,168 @@ class ClientRepDecorator(ClientRep):
     def __getattr__(self, name):
         return getattr(self._wrapped_repo, name)
 
+    @property
+    def native_queries(self):
+        return self._wrapped_repo.native_queries
+
+    @property
+    def generates_ids(self):
+        return self._wrapped_repo.generates_ids
+
+    def _data_version(self):
+        return self._wrapped_repo._data_version()
+
+    def io_counters(self):
+        return self._wrapped_repo.io_counters()
+
+    def _iter_prefix(self, prefix):
+        return self._wrapped_repo._iter_prefix(prefix)
+
+    def append_clients(self, clients, assign_ids=False):
+        return self._wrapped_repo.append_clients(clients, assign_ids)
+
+    @contextmanager
+    def batch(self):
+        with self._wrapped_repo.batch():
+            yield self
+
+    def search_prefix(self, prefix, limit=20):
+        return self._wrapped_repo.search_prefix(prefix, limit)
+
+    def write_all(self, clients):
+        return self._wrapped_repo.write_all(clients)
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        return self._wrapped_repo.add_client(
+            last_name, first_name, phone, address, otch
+        )
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        return self._wrapped_repo.update_client(
+            client_id, last_name, first_name, phone, address, otch
+        )
+
+    def delete_client(self, client_id):
+        return self._wrapped_repo.delete_client(client_id)
+
 
 class FilterSortDecorator(ClientRepDecorator):
     def __init__(
-        self, wrapped_repo, filter_func=None, sort_key=None, reverse_sort=False
+        self,
+        wrapped_repo,
+        filter_func=None,
+        sort_key=None,
+        reverse_sort=False,
+        query=None,
+        partial_sort_limit=1024,
+        cache_view=True,
     ):
         super().__init__(wrapped_repo)
         self.filter_func = filter_func
+        if isinstance(sort_key, str):
+            field = sort_key
+            sort_key = lambda client: russian_collation_key(getattr(client, field))
         self.sort_key = sort_key
         self.reverse_sort = reverse_sort
+        self.query_spec = query
+        self.partial_sort_limit = partial_sort_limit
+        self.cache_view = cache_view
+        self._mutations = 0
+        self._view = None
+        self._sorted_view = None
+        self._view_stamp = None
+
+    def _data_version(self):
+        version = self._wrapped_repo._data_version()
+        return None if version is None else (version, self._mutations)
+
+    def invalidate_view(self):
+        self._mutations += 1
+        self._view = None
+        self._sorted_view = None
+        self._view_stamp = None
+
+    def _cached_view(self, ordered=True):
+        if not self.cache_view:
+            return None
+        if self._can_push_down() and self._wrapped_repo.native_queries:
+            return None
+        version = self._data_version()
+        if version is None:
+            return None
+        view = self._view
+        sorted_view = self._sorted_view
+        if view is None or self._view_stamp != version:
+            view = list(self._iter_filtered())
+            sorted_view = None
+            self._view = view
+            self._sorted_view = None
+            self._view_stamp = version
+        if not ordered or not self.sort_key:
+            return view
+        if sorted_view is None:
+            sorted_view = sorted(view, key=self.sort_key, reverse=self.reverse_sort)
+            self._sorted_view = sorted_view
+        return sorted_view
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        result = super().add_client(last_name, first_name, phone, address, otch)
+        self.invalidate_view()
+        return result
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        result = super().update_client(
+            client_id, last_name, first_name, phone, address, otch
+        )
+        self.invalidate_view()
+        return result
+
+    def delete_client(self, client_id):
+        result = super().delete_client(client_id)
+        self.invalidate_view()
+        return result
+
+    def write_all(self, clients):
+        result = super().write_all(clients)
+        self.invalidate_view()
+        return result
+
+    def append_clients(self, clients, assign_ids=False):
+        result = super().append_clients(clients, assign_ids)
+        self.invalidate_view()
+        return result
+
+    @contextmanager
+    def batch(self):
+        try:
+            with super().batch():
+                yield self
+        finally:
+            self.invalidate_view()
+            self._index_version = None
+
+    def _can_push_down(self):
+        return (
+            self.query_spec is not None
+            and self.filter_func is None
+            and self.sort_key is None
+        )
 
     def _filter_and_sort_clients(self, clients):
         if self.filter_func:
@@ -601,13 +3336,59 @@ class FilterSortDecorator(ClientRepDecorator):
         return clients
 
     def read_all(self):
-        clients = self._wrapped_repo.read_all()
+        view = self._cached_view()
+        if view is not None:
+            return list(view)
+        if self.query_spec is not None:
+            clients = self._wrapped_repo.query(self.query_spec)
+        else:
+            clients = self._wrapped_repo.read_all()
         return self._filter_and_sort_clients(clients)
 
+    def _iter_filtered(self):
+        if self.query_spec is not None:
+            source = self._wrapped_repo.iter_query(self.query_spec)
+        else:
+            source = self._wrapped_repo.iter_all()
+        if self.filter_func is None:
+            return source
+        return (client for client in source if self.filter_func(client))
+
+    def search_prefix(self, prefix, limit=20):
+        return list(itertools.islice(self._iter_prefix(prefix), limit))
+
+    def _iter_prefix(self, prefix):
+        for client in self._wrapped_repo._iter_prefix(prefix):
+            if self.query_spec is not None and not self.query_spec.matches(client):
+                continue
+            if self.filter_func is None or self.filter_func(client):
+                yield client
+
+    def iter_all(self):
+        view = self._cached_view()
+        if view is not None:
+            return iter(list(view))
+        if self.sort_key is not None:
+            return iter(self.read_all())
+        return self._iter_filtered()
+
     def get_k_n_short_list(self, k, n):
-        clients = self.read_all()
+        view = self._cached_view()
+        if view is not None:
+            start_index = max((n - 1) * k, 0)
+            return [client.short() for client in view[start_index : start_index + k]]
+        if self._can_push_down():
+            return self._wrapped_repo.query_page(self.query_spec, k, n)
         start_index = (n - 1) * k
+        if self.sort_key is None and start_index >= 0:
+            page = itertools.islice(self._iter_filtered(), start_index, start_index + k)
+            return [client.short() for client in page]
         end_index = start_index + k
+        if 0 <= start_index and end_index <= self.partial_sort_limit:
+            select = heapq.nlargest if self.reverse_sort else heapq.nsmallest
+            top = select(end_index, self._iter_filtered(), key=self.sort_key)
+            return [client.short() for client in top[start_index:]]
+        clients = self.read_all()
         result = []
         for i in range(start_index, end_index):
             if i < len(clients):
@@ -616,41 +3397,549 @@ class FilterSortDecorator(ClientRepDecorator):
         return result
 
     def get_count(self):
-        clients = self.read_all()
-        return len(clients)
-
-
-json_repo = ClientRepJson("clients.json")
-decorated_json = FilterSortDecorator(
-    json_repo, sort_key=lambda client: client.first_name, reverse_sort=True
-)
-result_json = decorated_json.get_k_n_short_list(6, 1)
-for client in result_json:
-    print(client.get_info())
-print(f"\nклиентов в JSON: {decorated_json.get_count()}\n")
-
-yaml_repo = ClientRepYaml("clients.yaml")
-decorated_yaml = FilterSortDecorator(
-    yaml_repo,
-    filter_func=lambda client: client.address == "Москва",
-    sort_key=lambda client: client.first_name,
-    reverse_sort=False,
-)
-result_yaml = decorated_yaml.get_k_n_short_list(5, 1)
-for client in result_yaml:
-    print(client.get_info())
-print(f"\nклиентов в YAML отсортированные: {decorated_yaml.get_count()}")
+        view = self._cached_view(ordered=False)
+        if view is not None:
+            return len(view)
+        if self.query_spec is not None and self.filter_func is None:
+            return self._wrapped_repo.query_count(self.query_spec)
+        return sum(1 for _ in self._iter_filtered())
+
+
+class LatencyHistogram:
+    BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self):
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class OperationMetrics:
+    def __init__(self, buckets=LatencyHistogram.BUCKETS):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.round_trips = 0
+        self.latency = LatencyHistogram(buckets)
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "round_trips": self.round_trips,
+            "latency_sum": self.latency.total,
+            "latency_buckets": [
+                [str(bound), count] for bound, count in self.latency.cumulative()
+            ],
+        }
+
+
+class MetricsDecorator(ClientRepDecorator):
+    def __init__(
+        self,
+        wrapped_repo,
+        slow_threshold=None,
+        logger=None,
+        buckets=LatencyHistogram.BUCKETS,
+    ):
+        super().__init__(wrapped_repo)
+        self.slow_threshold = slow_threshold
+        self.logger = logger or logging.getLogger(__name__)
+        self.buckets = buckets
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    @staticmethod
+    def _count_rows(result):
+        if isinstance(result, (list, tuple)):
+            return len(result)
+        if isinstance(result, ShortClient):
+            return 1
+        return 0
+
+    @staticmethod
+    def _describe_args(args):
+        parts = []
+        for arg in args:
+            if arg is None or isinstance(arg, (bool, int, float, str)):
+                parts.append(repr(arg))
+            elif hasattr(arg, "__len__"):
+                parts.append(f"<{type(arg).__name__}: {len(arg)}>")
+            else:
+                parts.append(f"<{type(arg).__name__}>")
+        return ", ".join(parts)
+
+    def _timed(self, operation, func, *args):
+        before = self._wrapped_repo.io_counters()
+        start = time.perf_counter()
+        failed = False
+        result = None
+        try:
+            result = func(*args)
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            after = self._wrapped_repo.io_counters()
+            with self._metrics_lock:
+                metrics = self._metrics.get(operation)
+                if metrics is None:
+                    metrics = self._metrics[operation] = OperationMetrics(self.buckets)
+                metrics.calls += 1
+                metrics.errors += failed
+                metrics.rows += self._count_rows(result)
+                metrics.bytes_read += after["bytes_read"] - before["bytes_read"]
+                metrics.bytes_written += (
+                    after["bytes_written"] - before["bytes_written"]
+                )
+                metrics.round_trips += after["round_trips"] - before["round_trips"]
+                metrics.latency.observe(elapsed)
+            if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+                self.logger.warning(
+                    "Медленная операция %s(%s): %.3f с",
+                    operation,
+                    self._describe_args(args),
+                    elapsed,
+                )
+
+    def snapshot(self):
+        with self._metrics_lock:
+            return {name: metrics.to_dict() for name, metrics in self._metrics.items()}
+
+    def reset(self):
+        with self._metrics_lock:
+            self._metrics = {}
+
+    def prometheus_text(self, prefix="client_repo"):
+        snapshot = self.snapshot()
+        lines = []
+        counters = (
+            ("calls", "calls_total"),
+            ("errors", "errors_total"),
+            ("rows", "rows_total"),
+            ("bytes_read", "bytes_read_total"),
+            ("bytes_written", "bytes_written_total"),
+            ("round_trips", "sql_round_trips_total"),
+        )
+        for key, name in counters:
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for operation, data in snapshot.items():
+                lines.append(f'{prefix}_{name}{{operation="{operation}"}} {data[key]}')
+        lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+        for operation, data in snapshot.items():
+            for bound, count in data["latency_buckets"]:
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(
+                    f'{prefix}_latency_seconds_bucket{{operation="{operation}",'
+                    f'le="{le}"}} {count}'
+                )
+            lines.append(
+                f'{prefix}_latency_seconds_sum{{operation="{operation}"}} '
+                f'{data["latency_sum"]}'
+            )
+            lines.append(
+                f'{prefix}_latency_seconds_count{{operation="{operation}"}} '
+                f'{data["calls"]}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def read_all(self):
+        return self._timed("read_all", self._wrapped_repo.read_all)
+
+    def write_all(self, clients):
+        return self._timed("write_all", self._wrapped_repo.write_all, clients)
+
+    def append_clients(self, clients, assign_ids=False):
+        return self._timed(
+            "append_clients", self._wrapped_repo.append_clients, clients, assign_ids
+        )
+
+    def get_by_id(self, client_id):
+        return self._timed("get_by_id", self._wrapped_repo.get_by_id, client_id)
+
+    def find_by_field(self, field, value):
+        return self._timed(
+            "find_by_field", self._wrapped_repo.find_by_field, field, value
+        )
+
+    def search_prefix(self, prefix, limit=20):
+        return self._timed(
+            "search_prefix", self._wrapped_repo.search_prefix, prefix, limit
+        )
+
+    def get_k_n_short_list(self, k, n):
+        return self._timed(
+            "get_k_n_short_list", self._wrapped_repo.get_k_n_short_list, k, n
+        )
+
+    def get_count(self):
+        return self._timed("get_count", self._wrapped_repo.get_count)
+
+    def query(self, spec):
+        return self._timed("query", self._wrapped_repo.query, spec)
+
+    def query_count(self, spec):
+        return self._timed("query_count", self._wrapped_repo.query_count, spec)
+
+    def query_page(self, spec, k, n):
+        return self._timed("query_page", self._wrapped_repo.query_page, spec, k, n)
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        return self._timed(
+            "add_client",
+            self._wrapped_repo.add_client,
+            last_name,
+            first_name,
+            phone,
+            address,
+            otch,
+        )
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        return self._timed(
+            "update_client",
+            self._wrapped_repo.update_client,
+            client_id,
+            last_name,
+            first_name,
+            phone,
+            address,
+            otch,
+        )
+
+    def delete_client(self, client_id):
+        return self._timed("delete_client", self._wrapped_repo.delete_client, client_id)
+
+
+class CachingDecorator(ClientRepDecorator):
+    def __init__(self, wrapped_repo, max_entries=1024, ttl=30.0, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("Размер кэша должен быть положительным")
+        super().__init__(wrapped_repo)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _cached(self, key, loader):
+        with self._cache_lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                value, expires = entry
+                if self.ttl is None or expires > self.clock():
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return value
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self._cache_lock:
+            if generation != self._generation:
+                return value
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _invalidate(self, client_id=None, pages=False, count=False):
+        with self._cache_lock:
+            self._generation += 1
+            for key, (value, _) in list(self._entries.items()):
+                if key[0] == "id":
+                    stale = key[1] == client_id
+                elif key[0] == "page":
+                    stale = pages or any(
+                        short.client_id == client_id for short in value
+                    )
+                else:
+                    stale = count
+                if stale:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._cache_lock:
+            self._generation += 1
+            self._entries = {}
+
+    def stats(self):
+        with self._cache_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def reset_stats(self):
+        with self._cache_lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def read_all(self):
+        return self._wrapped_repo.read_all()
+
+    def iter_all(self):
+        return self._wrapped_repo.iter_all()
+
+    def read_table(self):
+        return self._wrapped_repo.read_table()
+
+    def find_by_field(self, field, value):
+        return self._wrapped_repo.find_by_field(field, value)
+
+    def sort_by_field(self, field="last_name", reverse=False):
+        return self._wrapped_repo.sort_by_field(field, reverse)
+
+    def iter_query(self, spec):
+        return self._wrapped_repo.iter_query(spec)
+
+    def query(self, spec):
+        return self._wrapped_repo.query(spec)
+
+    def query_count(self, spec):
+        return self._wrapped_repo.query_count(spec)
+
+    def query_page(self, spec, k, n):
+        return self._wrapped_repo.query_page(spec, k, n)
+
+    def get_by_id(self, client_id):
+        return self._cached(
+            ("id", client_id), lambda: self._wrapped_repo.get_by_id(client_id)
+        )
+
+    def get_k_n_short_list(self, k, n):
+        page = self._cached(
+            ("page", k, n), lambda: self._wrapped_repo.get_k_n_short_list(k, n)
+        )
+        return list(page)
+
+    def get_count(self):
+        return self._cached(("count",), self._wrapped_repo.get_count)
+
+    def add_client(self, last_name, first_name, phone, address, otch=None):
+        result = super().add_client(last_name, first_name, phone, address, otch)
+        if result is not None:
+            self._invalidate(result.client_id, pages=True, count=True)
+        return result
+
+    def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        result = super().update_client(
+            client_id, last_name, first_name, phone, address, otch
+        )
+        if result is not None:
+            self._invalidate(client_id, pages=True, count=True)
+        else:
+            self._invalidate(client_id)
+        return result
+
+    def delete_client(self, client_id):
+        result = super().delete_client(client_id)
+        if result:
+            self._invalidate(client_id, pages=True, count=True)
+        return result
+
+    def write_all(self, clients):
+        result = super().write_all(clients)
+        self.clear()
+        return result
+
+    def append_clients(self, clients, assign_ids=False):
+        result = super().append_clients(clients, assign_ids)
+        self.clear()
+        return result
+
+    @contextmanager
+    def batch(self):
+        try:
+            with super().batch():
+                yield self
+        finally:
+            self.clear()
+
+
+class AsyncClientRep:
+    def __init__(self, repo, max_workers=4, serialize_writes=True):
+        self.repo = repo
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._write_lock = asyncio.Lock() if serialize_writes else None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def _write(self, func, *args):
+        if self._write_lock is None:
+            return await self._run(func, *args)
+        async with self._write_lock:
+            return await self._run(func, *args)
+
+    async def read_all(self):
+        return await self._run(self.repo.read_all)
+
+    async def get_by_id(self, client_id):
+        return await self._run(self.repo.get_by_id, client_id)
+
+    async def get_by_ids(self, client_ids):
+        return await asyncio.gather(
+            *[self.get_by_id(client_id) for client_id in client_ids]
+        )
+
+    async def get_k_n_short_list(self, k, n):
+        return await self._run(self.repo.get_k_n_short_list, k, n)
+
+    async def get_count(self):
+        return await self._run(self.repo.get_count)
+
+    async def query(self, spec):
+        return await self._run(self.repo.query, spec)
+
+    async def query_page(self, spec, k, n):
+        return await self._run(self.repo.query_page, spec, k, n)
+
+    async def query_count(self, spec):
+        return await self._run(self.repo.query_count, spec)
+
+    async def add_client(self, last_name, first_name, phone, address, otch=None):
+        return await self._write(
+            self.repo.add_client, last_name, first_name, phone, address, otch
+        )
+
+    async def update_client(
+        self,
+        client_id,
+        last_name=None,
+        first_name=None,
+        phone=None,
+        address=None,
+        otch=None,
+    ):
+        return await self._write(
+            self.repo.update_client,
+            client_id,
+            last_name,
+            first_name,
+            phone,
+            address,
+            otch,
+        )
+
+    async def delete_client(self, client_id):
+        return await self._write(self.repo.delete_client, client_id)
+
+    async def close(self):
+        close = getattr(self.repo, "close", None)
+        if close is not None:
+            await self._run(close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+
+class AsyncClientRepJson(AsyncClientRep):
+    def __init__(self, filename, max_workers=4, **options):
+        super().__init__(ClientRepJson(filename, **options), max_workers)
+
+
+class AsyncClientRepYaml(AsyncClientRep):
+    def __init__(self, filename, max_workers=4, **options):
+        super().__init__(ClientRepYaml(filename, **options), max_workers)
+
+
+class AsyncClientRepDB(AsyncClientRep):
+    def __init__(self, max_workers=10, itersize=2000, trusted=False):
+        super().__init__(
+            ClientRepDBAdapter(itersize, trusted), max_workers, serialize_writes=False
+        )
+
+
+if __name__ == "__main__":
+    json_repo = ClientRepJson("clients.json")
+    decorated_json = FilterSortDecorator(
+        json_repo, sort_key=lambda client: client.first_name, reverse_sort=True
+    )
+    result_json = decorated_json.get_k_n_short_list(6, 1)
+    for client in result_json:
+        print(client.get_info())
+    print(f"\nклиентов в JSON: {decorated_json.get_count()}\n")
+
+    yaml_repo = ClientRepYaml("clients.yaml")
+    decorated_yaml = FilterSortDecorator(
+        yaml_repo,
+        filter_func=lambda client: client.address == "Москва",
+        sort_key=lambda client: client.first_name,
+        reverse_sort=False,
+    )
+    result_yaml = decorated_yaml.get_k_n_short_list(5, 1)
+    for client in result_yaml:
+        print(client.get_info())
+    print(f"\nклиентов в YAML отсортированные: {decorated_yaml.get_count()}")
 
-try:
-    db_repo = ClientRepDBAdapter()
     try:
-        db_decorator = FilterSortDecorator(db_repo, sort_key=lambda c: c.first_name)
-        print("\nвывод бд")
-        db_page = db_decorator.get_k_n_short_list(5, 1)
-        for i, client in enumerate(db_page, 1):
-            print(f"{i}. {client.get_info()}")
-        print(f"\nклиентов в бд: {db_decorator.get_count()}\n")
-    finally:
-        db_repo.close()
-except Exception as e:
-    print(f"БД репозиторий недоступен: {e}")
+        db_repo = ClientRepDBAdapter()
+        try:
+            db_decorator = FilterSortDecorator(db_repo, sort_key=lambda c: c.first_name)
+            print("\nвывод бд")
+            db_page = db_decorator.get_k_n_short_list(5, 1)
+            for i, client in enumerate(db_page, 1):
+                print(f"{i}. {client.get_info()}")
+            print(f"\nклиентов в бд: {db_decorator.get_count()}\n")
+        finally:
+            db_repo.close()
+    except Exception as e:
+        print(f"БД репозиторий недоступен: {e}")
@@ -0,0 +1,156 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import lab2
+from lab2 import ClientImporter, ClientRepJson, ClientRepSharded
+
+
+def _open_repo(kind, directory):
+    filename = os.path.join(directory, "clients.json")
+    if kind == "sharded":
+        return ClientRepSharded(filename, shard_count=3)
+    return ClientRepJson(
+        filename,
+        journal=kind == "journal",
+        compact_threshold=2048,
+        background_compaction=False,
+    )
+
+
+def _add_clients(kind, directory, count):
+    repo = _open_repo(kind, directory)
+    for index in range(count):
+        phone = f"+7{os.getpid() % 10000:04d}{index:06d}"
+        if repo.add_client("Процессов", "Иван", phone, "г.Тверь") is None:
+            raise SystemExit(1)
+
+
+def _add(repo, last_name="Иванов"):
+    return repo.add_client(last_name, "Иван", "+70000000000", "г.Тверь")
+
+
+@pytest.mark.parametrize("kind", ["json", "journal", "sharded"])
+def test_concurrent_add_client_from_processes_gives_unique_ids(tmp_path, kind):
+    processes = [
+        multiprocessing.Process(target=_add_clients, args=(kind, str(tmp_path), 25))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * 4
+    ids = sorted(client.client_id for client in _open_repo(kind, tmp_path).read_all())
+    assert ids == list(range(1, 101))
+
+
+def test_deleted_id_is_not_reused(tmp_path):
+    repo = ClientRepJson(str(tmp_path / "clients.json"))
+    for _ in range(3):
+        _add(repo)
+    assert repo.delete_client(3)
+    assert _add(ClientRepJson(str(tmp_path / "clients.json"))).client_id == 4
+
+
+def test_high_water_mark_follows_write_all(tmp_path):
+    repo = ClientRepJson(str(tmp_path / "clients.json"))
+    _add(repo)
+    assert repo.write_all([lab2.Client.from_trusted_row(10, "Петров", "Пётр")])
+    assert _add(repo).client_id == 11
+
+
+@pytest.mark.parametrize("kind", ["json", "sharded"])
+def test_import_with_kept_ids_raises_high_water_mark(tmp_path, kind):
+    source = tmp_path / "clients.csv"
+    source.write_text(
+        "2,Петров,Пётр,,г.Тверь,+70000000002\n3,Сидоров,Иван,,г.Тверь,+70000000003\n",
+        encoding="utf-8",
+    )
+    repo = _open_repo(kind, tmp_path)
+    _add(repo)
+    ClientImporter(repo, keep_ids=True).run(str(source))
+    _add(repo)
+    assert sorted(client.client_id for client in repo.read_all()) == [1, 2, 3, 4]
+
+
+def test_corrupt_json_raises_decode_error(tmp_path):
+    path = tmp_path / "clients.json"
+    path.write_text('[{"client_id": 1, "last_na', encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        ClientRepJson(str(path)).read_all()
+    with pytest.raises(json.JSONDecodeError):
+        _add(ClientRepJson(str(path)))
+    assert path.read_text(encoding="utf-8") == '[{"client_id": 1, "last_na'
+
+
+def test_failed_replace_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "clients.json"
+    repo = ClientRepJson(str(path))
+    _add(repo)
+    before = path.read_bytes()
+
+    def fail(source, target):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(lab2.os, "replace", fail)
+    assert _add(repo) is None
+    monkeypatch.undo()
+    assert path.read_bytes() == before
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+    assert [client.client_id for client in ClientRepJson(str(path)).read_all()] == [1]
+
+
+def _snapshot(repo):
+    return sorted(client.to_dict().items() for client in repo.read_all())
+
+
+def test_journal_replay_restores_state(tmp_path):
+    filename = str(tmp_path / "clients.json")
+    repo = ClientRepJson(filename, journal=True, compact_threshold=1024 * 1024)
+    for last_name in ("Иванов", "Петров", "Сидоров"):
+        _add(repo, last_name)
+    repo.update_client(1, otch="Иванович")
+    repo.delete_client(2)
+    assert repo.journal_size() > 0
+    assert ClientRepJson(filename).read_all() == []
+    restored = ClientRepJson(filename, journal=True)
+    assert _snapshot(restored) == _snapshot(repo)
+    assert restored.get_by_id(1).otch == "Иванович"
+    assert restored.get_by_id(2) is None
+
+
+def test_journal_replay_after_compaction(tmp_path):
+    filename = str(tmp_path / "clients.json")
+    repo = ClientRepJson(
+        filename, journal=True, compact_threshold=1024, background_compaction=False
+    )
+    expected = {}
+    compactions = 0
+    for index in range(40):
+        client = _add(repo, "Журналов")
+        expected[client.client_id] = None
+        if index % 3 == 0:
+            repo.update_client(client.client_id, otch="Сжатович")
+            expected[client.client_id] = "Сжатович"
+        if index % 4 == 0:
+            repo.delete_client(client.client_id)
+            del expected[client.client_id]
+        if not os.path.exists(repo.journal_path):
+            compactions += 1
+    assert compactions > 0
+    assert repo.compact()
+    kept = _add(repo, "Послесжатов")
+    dropped = _add(repo, "Послесжатов")
+    repo.update_client(kept.client_id, otch="Журналович")
+    repo.delete_client(dropped.client_id)
+    expected[kept.client_id] = "Журналович"
+    assert repo.journal_size() > 0
+    restored = ClientRepJson(filename, journal=True)
+    assert {c.client_id: c.otch for c in restored.read_all()} == expected
+    assert repo.compact()
+    assert not os.path.exists(repo.journal_path)
+    plain = ClientRepJson(filename)
+    assert {c.client_id: c.otch for c in plain.read_all()} == expected
@@ -0,0 +1,200 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from lab2 import ClientRepDB, DatabaseSingleton
+
+ROW = (5, "Иванов", "Иван", None, "г.Тверь", "+70000000000")
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self.connection.log.append((query, tuple(params or ())))
+        if self.connection.fail_on is not None and self.connection.fail_on in query:
+            raise RuntimeError("ошибка выполнения")
+        if query.startswith("EXECUTE"):
+            self.rows = [ROW]
+            self.rowcount = 1
+        else:
+            self.rows = []
+            self.rowcount = 0
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.autocommit_changes = []
+        self._autocommit = False
+        self.fail_on = None
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self.autocommit_changes.append(value)
+        self._autocommit = value
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append(("COMMIT",))
+
+    def rollback(self):
+        self.log.append(("ROLLBACK",))
+
+    def get_backend_pid(self):
+        return 42
+
+    def statements(self, prefix):
+        return [entry for entry in self.log if entry[0].startswith(prefix)]
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection_object = connection
+        self.acquired = 0
+
+    @contextmanager
+    def connection(self, timeout=None):
+        self.acquired += 1
+        yield self.connection_object
+
+
+@pytest.fixture
+def connection():
+    return FakeConnection()
+
+
+@pytest.fixture
+def repo(connection, monkeypatch):
+    db = object.__new__(DatabaseSingleton)
+    db.pool = FakePool(connection)
+    db._local = threading.local()
+    db._prepared = {}
+    db._prepared_lock = threading.Lock()
+    monkeypatch.setattr(DatabaseSingleton, "_instance", db)
+    return ClientRepDB(trusted=True)
+
+
+def test_statement_is_prepared_once_and_then_executed(repo, connection):
+    repo.get_by_id(5)
+    repo.get_by_id(6)
+    prepares = connection.statements("PREPARE")
+    executes = connection.statements("EXECUTE")
+    assert len(prepares) == 1
+    assert prepares[0][0].endswith("SELECT * FROM clients WHERE client_id = $1")
+    name = prepares[0][0].split()[1]
+    assert executes == [(f"EXECUTE {name} (%s)", (5,)), (f"EXECUTE {name} (%s)", (6,))]
+
+
+def test_placeholders_are_numbered_in_order(repo, connection):
+    repo.update_client(5, last_name="Петров", phone="+70000000001")
+    prepare = connection.statements("PREPARE")[0][0]
+    assert prepare.endswith(
+        "UPDATE clients SET last_name = $1, phone = $2 "
+        "WHERE client_id = $3 RETURNING *"
+    )
+    assert connection.statements("EXECUTE")[0][1] == ("Петров", "+70000000001", 5)
+
+
+def test_different_statements_get_different_names(repo, connection):
+    repo.get_by_id(5)
+    repo.delete_client(5)
+    names = {entry[0].split()[1] for entry in connection.statements("PREPARE")}
+    assert len(names) == 2
+
+
+def test_autocommit_is_reset_after_call(repo, connection):
+    repo.get_by_id(5)
+    assert connection.autocommit_changes == [True, False]
+    assert connection.autocommit is False
+    assert connection.statements("COMMIT") == []
+
+
+def test_autocommit_is_reset_after_error(repo, connection):
+    connection.fail_on = "EXECUTE"
+    with pytest.raises(RuntimeError):
+        repo.get_by_id(5)
+    assert connection.autocommit_changes == [True, False]
+    assert connection.autocommit is False
+
+
+def test_batch_runs_prepared_statements_on_bound_connection(repo, connection):
+    with repo.batch():
+        repo.add_client("Иванов", "Иван", "+70000000000", "г.Тверь")
+        repo.update_client(5, otch="Петрович")
+        repo.delete_client(5)
+    assert connection.autocommit_changes == []
+    assert repo.db.pool.acquired == 1
+    assert len(connection.statements("EXECUTE")) == 3
+    assert connection.log[-1] == ("COMMIT",)
+    assert connection.statements("COMMIT") == [("COMMIT",)]
+    assert repo.db._bound_connection() is None
+
+
+def test_batch_rolls_back_on_error(repo, connection):
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.delete_client(5)
+            raise RuntimeError("сбой")
+    assert connection.statements("COMMIT") == []
+    assert connection.log[-1] == ("ROLLBACK",)
+    assert repo.db._bound_connection() is None
+
+
+def test_prepared_statements_are_reused_across_batches(repo, connection):
+    repo.delete_client(5)
+    with repo.batch():
+        repo.delete_client(6)
+    assert len(connection.statements("PREPARE")) == 1
+    assert len(connection.statements("EXECUTE")) == 2
+
+
+def test_each_mutation_is_one_round_trip(repo, connection):
+    repo.add_client("Иванов", "Иван", "+70000000000", "г.Тверь")
+    repo.update_client(5, otch="Петрович")
+    repo.delete_client(5)
+    connection.log.clear()
+    repo.delegate.round_trips = 0
+    client = repo.add_client("Иванов", "Иван", "+70000000000", "г.Тверь")
+    assert client.client_id == 5
+    assert repo.update_client(5, otch="Петрович").client_id == 5
+    assert repo.delete_client(5) is True
+    assert repo.delegate.round_trips == 3
+    assert [entry[0].split()[0] for entry in connection.log] == ["EXECUTE"] * 3
+
+
+def test_prepare_counts_as_extra_round_trip(repo, connection):
+    repo.get_by_id(5)
+    assert repo.delegate.round_trips == 2
+    repo.get_by_id(6)
+    assert repo.delegate.round_trips == 3
+    assert repo.delegate.round_trips == len(connection.log)
+
+
+def test_invalid_input_sends_nothing(repo, connection):
+    assert repo.add_client("123", "Иван", "+70000000000", "г.Тверь") is None
+    assert repo.update_client(5, phone="12") is None
+    assert connection.log == []
+    assert repo.delegate.round_trips == 0